@@ -9,39 +9,159 @@ For parsing new training data using one of the parsers in src/parsers, see parse
 """
 
 import os.path
+import re
+import sys
 import glob
 import argparse
 
 from src import utils
-from src import generator
-from src import trainer
 
 
-# create list of valid input file for --train and --generate options
-models = glob.glob("data/cache/*.dat")
-models = list(map(os.path.basename, models))
-training_files = glob.glob("data/training/*.txt")
-training_files = list(map(os.path.basename, training_files))
+# Heavy modules (the trainer and generator and their json decoder) are imported by the sub command
+# functions below and valid input files are only looked up for the command being run. This keeps
+# startup fast for cron driven generation.
 
-if __name__ == "__main__":
+DEFAULT_NGRAM = 3
+VERSIONED_FILE = re.compile(r"\.v\d+\.dat$")  # versioned files of a model, see src/model.py
+
+def _validate_file(parser, filename, folder, pattern):
+	"""Exit with an argparse error if filename is not a file in folder. Lists valid choices on error."""
+	path = os.path.join(utils.BASE, "data", folder)
+	if not os.path.isfile(os.path.join(path, filename)):
+		choices = sorted(map(os.path.basename, glob.glob(os.path.join(path, pattern))))
+		choices = [choice for choice in choices if not VERSIONED_FILE.search(choice)]
+		msg = "invalid choice: '{}' (choose from {})".format(filename, ", ".join(choices))
+		parser.error(msg)
+
+def _split_ngram(training_files, ngram):
+	"""Separate the ngram size from the training sources. For backward compatibility n can also be given
+	after the sources, eg. train file.txt 4, unless -n is given or a training source of that name exists.
+	Return:
+		a tuple of the training sources and the ngram size
+	"""
+	from src import sources
+
+	if ngram is None and len(training_files) > 1 and training_files[-1].isdigit():
+		try:
+			sources.resolve(training_files[-1:])
+		except FileNotFoundError:
+			return training_files[:-1], int(training_files[-1])
+
+	return training_files, DEFAULT_NGRAM if ngram is None else ngram
+
+def train(args):
+	"""Run the train sub command."""
+	from src import trainer
+
+	training_files, ngram = _split_ngram(args.training_file, args.ngram)
+	try:
+		trn = trainer.Trainer(training_files, ngram, profile=args.profile, memory_budget=args.memory_budget,
+			overlap=args.overlap, output=args.output, workers=args.workers)
+		trn.validate()
+	except (ValueError, FileNotFoundError) as e:
+		args.subparser.error(e)
+	if not args.force and trn.is_up_to_date():
+		print("Model {} is up to date, use --force to retrain".format(trn.cache_file))
+	else:
+		trn.train()
+	return trn.stats
+
+def inspect(args):
+	"""Run the inspect sub command: print and validate a model header."""
+	from src import model
+
+	_validate_file(args.subparser, args.model, "cache", "*.dat")
+	path = os.path.join(utils.BASE, "data", "cache", args.model)
+	try:
+		header = model.validate(path)
+	except ValueError as e:
+		sys.exit(e)
+
+	print("version:    {}".format(header.version))
+	print("n:          {}".format(header.order))
+	print("keys:       {}".format(header.states))
+	print("vocabulary: {}".format(header.vocabulary))
+	print("ngrams:     {}".format(header.ngrams))
+	print("checksum:   {}".format(header.checksum))
+	for name, section in header.sections.items():
+		print("section:    {:<8} offset {} length {}".format(name, section.offset, section.length))
+
+def generate(args):
+	"""Run the generate sub command."""
+	_validate_file(args.subparser, args.model, "cache", "*.dat")
+	if args.engine == "numpy":
+		from src.numpy_generator import NumpyGenerator as Generator
+	else:
+		from src.generator import Generator
+
+	try:
+		gen = Generator(args.model, profile=args.profile, seed=args.seed, avoid_overlap=args.avoid_copies,
+			style=args.style)
+		# resolve the requested words before starting any workers
+		gen.start_state(args.seed_word, args.must_include)
+	except ValueError as e:
+		args.subparser.error(e)
+
+	if args.workers > 1 or args.seed is not None:
+		from src import parallel
+		text = parallel.generate_paragraphs(gen, args.nword, args.paragraphs, args.workers, args.seed,
+			args.seed_word, args.must_include, args.max_chars)
+	else:
+		text = gen.generate_paragraphs(args.nword, args.paragraphs, args.seed_word, args.must_include, args.max_chars)
+	print(text)
+	return gen.stats
+
+def build_parser():
+	"""Create the command line argument parser."""
 	parser = argparse.ArgumentParser(description="Generates Markov chain based random text based on input text")
-	subparsers = parser.add_subparsers(description="Training and generator sub commands", dest="command")
+	subparsers = parser.add_subparsers(description="Training, generator and model sub commands", dest="command")
+
+	# options shared by all sub commands
+	common = argparse.ArgumentParser(add_help=False)
+	common.add_argument("--profile", help="Print phase timings, counters and peak memory usage to stderr", action="store_true")
 
-	parser_trainer = subparsers.add_parser("train", help="Train a model using input plain text file from data/training")
-	parser_trainer.add_argument("training_file", help="Input text file from data/training to use", metavar="training_file", choices=training_files)
-	parser_trainer.add_argument("ngram", help="ngram size. Defaults to 3", nargs="?", metavar="n", type=int, default=3)
+	parser_trainer = subparsers.add_parser("train", help="Train a model using input plain text files from data/training", parents=[common])
+	parser_trainer.add_argument("training_file", help="Input text files, directories or glob patterns in data/training to use. Files may be compressed with gzip, bzip2, xz or zstd", nargs="+", metavar="training_file")
+	parser_trainer.add_argument("-n", "--ngram", help="ngram size. Defaults to {}".format(DEFAULT_NGRAM), metavar="N", type=int)
+	parser_trainer.add_argument("--memory-budget", help="Approximate memory in MB to use for counting ngrams. When reached, partial counts are spilled to temporary files and merged at the end", type=int, metavar="MB")
+	parser_trainer.add_argument("--overlap", help="Store a Bloom filter of all K word spans of the training data in the model for generate --avoid-copies. K must be larger than n", type=int, metavar="K")
+	parser_trainer.add_argument("--output", help="Name of the model in data/cache. Required for training from several files or a glob pattern", metavar="MODEL")
+	parser_trainer.add_argument("--workers", help="Number of processes for decompressing and tokenizing training files. Defaults to 1", type=int, default=1)
+	parser_trainer.add_argument("--force", help="Retrain even if the model is up to date with the training file", action="store_true")
+	parser_trainer.set_defaults(func=train, subparser=parser_trainer)
 
-	parser_generator = subparsers.add_parser("generate", help="Generate text using a trained model in data/cache")
-	parser_generator.add_argument("model", help="Model in data/cache to use", metavar="model", choices=models)
+	parser_generator = subparsers.add_parser("generate", help="Generate text using a trained model in data/cache", parents=[common])
+	parser_generator.add_argument("model", help="Model in data/cache to use", metavar="model")
 	parser_generator.add_argument("nword", help="Approximate number of words to generate for each paragraph. Defaults to 25", nargs="?", default=25, type=int)
 	parser_generator.add_argument("paragraphs", help="Number of paragraphs to generate. Defaults to 1", nargs="?", default=1, type=int, metavar="paragraphs")
-	args = parser.parse_args()
+	parser_generator.add_argument("--engine", help="Sampling engine: python (default) or numpy for vectorized bulk generation", choices=("python", "numpy"), default="python")
+	parser_generator.add_argument("--seed-word", help="A word the text should start with")
+	parser_generator.add_argument("--must-include", help="A word the text should contain", metavar="WORD")
+	parser_generator.add_argument("--max-chars", help="Maximum length of the text in characters. Paragraphs end at the last complete sentence that fits", type=int, metavar="N")
+	parser_generator.add_argument("--avoid-copies", help="Avoid copying spans of K words verbatim from the training data. Requires a model trained with --overlap K", action="store_true")
+	parser_generator.add_argument("--style", help="Post-processing profile: default, tweet to remove @ mentions or poem to break lines after each clause", choices=("default", "tweet", "poem"), default="default")
+	parser_generator.add_argument("--workers", help="Number of worker processes to split the paragraphs to. Defaults to 1", type=int, default=1)
+	parser_generator.add_argument("--seed", help="Random seed for reproducible output. The same seed produces the same text for any number of workers", type=int)
+	parser_generator.set_defaults(func=generate, subparser=parser_generator)
 
-	if args.command == "train":
-		trn = trainer.Trainer(args.training_file, args.ngram)
-		trn.train()
+	parser_inspect = subparsers.add_parser("inspect", help="Print and validate the header of a model in data/cache")
+	parser_inspect.add_argument("model", help="Model in data/cache to inspect", metavar="model")
+	parser_inspect.set_defaults(func=inspect, subparser=parser_inspect, profile=False)
 
-	elif args.command == "generate":
-		gen = generator.Generator(args.model)
-		text = gen.generate_paragraphs(args.nword, args.paragraphs)
-		print(text)
\ No newline at end of file
+	return parser
+
+def main(argv=None):
+	"""Parse command line arguments and run the selected sub command."""
+	parser = build_parser()
+	args = parser.parse_args(argv)
+	if not args.command:
+		parser.print_help()
+		return
+
+	stats = args.func(args)
+	if args.profile and stats:
+		print(stats.report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+	main()
@@ -5,10 +5,8 @@
 
 import argparse
 
-import src.parsers.text_parser
-import src.parsers.steam_parser
-import src.parsers.poem_parser
-from twitter.parser import TwitterParser
+# Parsers are imported only for the option being run: the Steam and poem parsers depend on requests and
+# bs4 and the Twitter parser reads API keys and creates a client on import.
 
 
 if __name__ == "__main__":
@@ -26,10 +24,12 @@ if __name__ == "__main__":
 	args = parser.parse_args()
 
 	if args.text:
+		import src.parsers.text_parser
 		parser = src.parsers.text_parser.TextParser(args.text)
 		parser.run()
 
 	elif args.twitter:
+		from twitter.parser import TwitterParser
 		parser = TwitterParser(args.handle)
 
 		if args.fetch:
@@ -42,9 +42,11 @@ if __name__ == "__main__":
 			parser.save(res)
 
 	elif args.steam:
+		import src.parsers.steam_parser
 		parser = src.parsers.steam_parser.SteamParser(args.steam)
 		parser.run()
 
 	elif args.poem:
+		import src.parsers.poem_parser
 		parser = src.parsers.poem_parser.PoemParser()
 		parser.run()
\ No newline at end of file
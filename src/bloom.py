@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bloom filter for checking whether a span of words appears in the training data. A trainer adds every
+k consecutive words (k-gram) of the training data to the filter and stores it in the model. A generator
+can then check whether the last k words it generated were copied verbatim from the training data in
+constant time without access to the training data.
+
+A Bloom filter has no false negatives, but may report a span that does not appear in the training data
+as copied with a small probability, see for_capacity.
+"""
+
+import math
+import struct
+import hashlib
+
+
+_HEADER = struct.Struct("<IQI")  # k, number of bits, number of hash functions
+HEADER_SIZE = _HEADER.size
+
+
+
+class BloomFilter():
+
+	def __init__(self, k, size, hashes):
+		"""Create an empty filter.
+		Args:
+			k (int): number of words in each span
+			size (int): number of bits in the filter
+			hashes (int): number of hash functions
+		"""
+		self.k = k
+		self.size = size
+		self.hashes = hashes
+		self.bits = bytearray((size + 7) // 8)
+
+	@classmethod
+	def for_capacity(cls, k, capacity, error_rate=0.01):
+		"""Create a filter sized for a number of spans and a false positive rate."""
+		capacity = max(capacity, 1)
+		size = int(-capacity * math.log(error_rate) / math.log(2)**2) + 1
+		hashes = max(int(round(size / capacity * math.log(2))), 1)
+		return cls(k, size, hashes)
+
+	def _positions(self, words):
+		"""Compute the bit positions of a span using double hashing of a single blake2b digest."""
+		digest = hashlib.blake2b(" ".join(words).encode("utf8"), digest_size=16).digest()
+		h1 = int.from_bytes(digest[:8], "little")
+		h2 = int.from_bytes(digest[8:], "little") | 1
+		return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+	def add(self, words):
+		"""Add a span of k words to the filter."""
+		for pos in self._positions(words):
+			self.bits[pos >> 3] |= 1 << (pos & 7)
+
+	def __contains__(self, words):
+		"""Check whether a span of k words has (probably) been added to the filter."""
+		return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(words))
+
+	def to_bytes(self):
+		"""Serialize the filter."""
+		return _HEADER.pack(self.k, self.size, self.hashes) + bytes(self.bits)
+
+	@staticmethod
+	def span_length(data):
+		"""Read the span length k of a serialized filter from its first HEADER_SIZE bytes."""
+		return _HEADER.unpack_from(data)[0]
+
+	@classmethod
+	def from_bytes(cls, data):
+		"""Deserialize a filter created with to_bytes."""
+		k, size, hashes = _HEADER.unpack_from(data)
+		bloom = cls(k, size, hashes)
+		bloom.bits = bytearray(data[_HEADER.size:])
+		return bloom
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Streaming deduplication of training texts. Parsers pass each text (a tweet, a game description) through a
+Deduplicator before adding it to the training data, so retweeted boilerplate and repeated promotional
+paragraphs do not inflate the corpus and bias successor lists.
+
+Exact duplicates, ignoring case and whitespace, are detected with a Bloom filter of text hashes. Near
+duplicates are detected with MinHash signatures of word shingles and locality sensitive hashing (LSH): each
+signature is split into bands and texts sharing a band are compared by the fraction of equal signature values,
+an estimate of the Jaccard similarity of their shingles.
+
+Memory is bounded: the Bloom filter has a fixed size and near duplicates are only searched among the
+signatures of the last window_size unique texts.
+"""
+
+import array
+import random
+import hashlib
+import collections
+
+from src import bloom
+from src import tokenizer
+
+
+MERSENNE_PRIME = 2**61 - 1
+
+
+
+class Deduplicator():
+
+	def __init__(self, threshold=0.8, capacity=10**6, window_size=10**4, num_perm=64, bands=16, shingle_size=3):
+		"""Create an empty deduplicator.
+		Args:
+			threshold (float): estimated Jaccard similarity at or above which texts are near duplicates
+			capacity (int): expected number of unique texts, sizes the exact duplicate filter
+			window_size (int): number of most recent unique texts to search for near duplicates
+			num_perm (int): number of MinHash permutations
+			bands (int): number of LSH bands, must divide num_perm
+			shingle_size (int): number of words in each shingle
+		"""
+		if num_perm % bands:
+			raise ValueError("Number of bands {} does not divide number of permutations {}".format(bands, num_perm))
+
+		self.threshold = threshold
+		self.window_size = window_size
+		self.bands = bands
+		self.rows = num_perm // bands
+		self.shingle_size = shingle_size
+
+		rng = random.Random(0)  # fixed permutations for reproducible output
+		self.permutations = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(MERSENNE_PRIME)) for _ in range(num_perm)]
+
+		self.exact = bloom.BloomFilter.for_capacity(1, capacity)
+		self.buckets = collections.defaultdict(list)  # (band, band hash) -> ids of texts in the window
+		self.signatures = collections.OrderedDict()  # id -> signature of the texts in the window, oldest first
+		self.next_id = 0
+
+		self.exact_duplicates = 0
+		self.near_duplicates = 0
+
+	def signature(self, words):
+		"""Compute the MinHash signature of the shingles of a list of words."""
+		k = self.shingle_size
+		shingles = {" ".join(words[i: i + k]) for i in range(max(len(words) - k + 1, 1))}
+		hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf8"), digest_size=8).digest(), "little") for s in shingles]
+
+		return array.array("Q", [min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in self.permutations])
+
+	def band_keys(self, signature):
+		"""Split a signature into LSH bucket keys, one per band."""
+		return [(i, hash(tuple(signature[i * self.rows: (i + 1) * self.rows]))) for i in range(self.bands)]
+
+	def similarity(self, a, b):
+		"""Estimate the Jaccard similarity of two texts from their signatures."""
+		return sum(x == y for x, y in zip(a, b)) / len(a)
+
+	def is_duplicate(self, text):
+		"""Check whether a text is an exact or near duplicate of a previous text. Texts that are not
+		duplicates are remembered for checking later texts.
+		"""
+		words = tokenizer.DEFAULT.tokens(text.lower())
+		if not words:
+			return True
+
+		if words in self.exact:
+			self.exact_duplicates += 1
+			return True
+		self.exact.add(words)
+
+		signature = self.signature(words)
+		keys = self.band_keys(signature)
+		candidates = {id_ for key in keys for id_ in self.buckets.get(key, ())}
+		if any(self.similarity(signature, self.signatures[id_]) >= self.threshold for id_ in candidates):
+			self.near_duplicates += 1
+			return True
+
+		self.add(signature, keys)
+		return False
+
+	def add(self, signature, keys):
+		"""Add the signature of a unique text to the window, evicting the oldest text if the window is full."""
+		id_ = self.next_id
+		self.next_id += 1
+		self.signatures[id_] = signature
+		for key in keys:
+			self.buckets[key].append(id_)
+
+		if len(self.signatures) > self.window_size:
+			old_id, old_signature = self.signatures.popitem(last=False)
+			for key in self.band_keys(old_signature):
+				bucket = self.buckets[key]
+				bucket.remove(old_id)
+				if not bucket:
+					del self.buckets[key]
+
+	def filter(self, texts):
+		"""Filter duplicates from a stream of texts.
+		Yield:
+			texts that are not duplicates of a previous text
+		"""
+		for text in texts:
+			if not self.is_duplicate(text):
+				yield text
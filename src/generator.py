@@ -6,75 +6,256 @@ Generator class. Given a .dat file data/cache generates text by chaining randoml
 randomly selected successor words. Initial key is randomized, successive keys are are generated
 by joining the rightmost n-2 keywords with the selected successor. Since keys in the cache file
 are ngrams of length n-1, this method will result in valid keys.
+
+Long running processes can pick up retrained models with reload, or with start_reloader which checks for
+a newly published version of the model in a background thread. The new model is loaded while generating
+continues with the current one, and swapped in between texts.
 """
 
 import os
 import random
-import simplejson as json  # faster decoding than the standard llibrary module
+import functools
+import threading
 
 from src import utils
+from src import profiler
+from src import model
+from src import bloom
+from src import postprocess
+
+
+BUDGET_RETRIES = 10  # attempts to fit a complete sentence within a character limit before giving up
+OVERLAP_RETRIES = 5  # attempts to choose a word not continuing a span copied from the training data
+
+def paragraph_budget(max_chars, paragraphs):
+	"""Split a character limit for a text evenly between its paragraphs, accounting for the paragraph separators."""
+	if max_chars is None:
+		return None
+
+	return (max_chars - len("\n\n") * (paragraphs - 1)) // max(paragraphs, 1)
 
+def locked(method):
+	"""Decorator for holding the generator lock while generating so a reload cannot swap the model mid text."""
+	@functools.wraps(method)
+	def wrapper(self, *args, **kwargs):
+		with self.lock:
+			return method(self, *args, **kwargs)
+
+	return wrapper
 
 
 class Generator():
 
-	def __init__(self, cache_file):
-		"""Load the cache file."""
+	CHUNK_SIZE = 16  # paragraphs per task when generating in parallel, see src/parallel.py
+
+	# attributes replaced when reloading the model
+	MODEL_ATTRIBUTES = ("model_path", "model_stamp", "cache_data", "index", "index_keys", "overlap")
+
+	def __init__(self, cache_file, profile = False, seed = None, avoid_overlap = False, style = "default"):
+		"""Load the cache file.
+		Args:
+			cache_file (str): name of the model in data/cache
+			profile (boolean): whether to record phase timings and counters to self.stats
+			seed (int): seed for the random number generator, None to seed from system entropy
+			avoid_overlap (boolean): whether to avoid copying spans of k words verbatim from the training data.
+				Requires a model trained with a Bloom filter of the training data.
+			style (str): name of the post-processing profile in postprocess.PROFILES for rendering the text
+		"""
+		self.cache_file = cache_file
 		self.path_to_cache_file = os.path.join(utils.BASE, "data", "cache", cache_file)
-		self.cache_data = self.get_cache_data()
+		self.stats = profiler.Stats(enabled=profile)
+		self.seed(seed)
+		self.lock = threading.RLock()
+		self.reloader = None
+
+		# the published version of the model, read from this file even if a new version is published meanwhile
+		self.model_path = model.resolve_version(self.path_to_cache_file)
+		self.model_stamp = model.stamp(self.model_path)
+		with self.stats.phase("load"):
+			self.cache_data = self.get_cache_data()
+
+		self.index = None  # word index, loaded on first use by get_index
+		self.index_keys = None
+		self.overlap = self.get_overlap_filter() if avoid_overlap else None
+		self.style = style
+		self.postprocessor = postprocess.PROFILES[style]
+
+	@property
+	def cache_data(self):
+		"""The successor dictionary of the model."""
+		return self._cache_data
+
+	@cache_data.setter
+	def cache_data(self, cache_data):
+		self._cache_data = cache_data
+		self._keys = None  # list of the keys, built on first use by get_keys
+
+	def get_keys(self):
+		"""Get the keys of the model as a list in table order. The list is built once per loaded model."""
+		if self._keys is None:
+			self._keys = list(self.cache_data)
+		return self._keys
+
+	def random_key(self):
+		"""Choose a random key of the model in constant time."""
+		keys = self.get_keys()
+		return keys[self.randrange(len(keys))]
+
+	def seed(self, seed):
+		"""(Re)initialize the random number generator of this generator. Each generator has its own
+		random.Random instance so output is reproducible and independent of other generators.
+		"""
+		self.rng = random.Random(seed)
+
+	def randrange(self, n):
+		"""Choose a random integer in range(n)."""
+		return self.rng.randrange(n)
 
-	def generate(self, size = 25, complete_sentence = False):
+	@locked
+	def generate(self, size = 25, complete_sentence = False, seed_word = None, must_include = None, max_chars = None):
 		"""Generates a string of size words by randomly selecting words from the successor dictionary using the
 		previous n-1 words as the key.
 		Arg:
 			size (int): number of words the text should contain.
 			complete_sentence (boolean): whether to continue adding words past size to the sentence until a punctuation
 				character or a capitalized word is encoutered.
+			seed_word (str): a word the text should start with
+			must_include (str): a word the text should contain
+			max_chars (int): maximum length of the text in characters. The text is ended at the last complete
+				sentence that fits, even if it is shorter than size. The text is empty if no sentence fits in
+				BUDGET_RETRIES attempts.
 		Return:
 			the generated text
 		"""
-		words = []
-		# Randomly select initial key to start generating from (note, key is not included in the actual text)
-		cache_keys = list(self.cache_data.keys()) # convert dict_keys to list for random.choice
-		key = random.choice(cache_keys)
+		with self.stats.phase("generate"):
+			if max_chars is None:
+				words = self._generate_words(size, complete_sentence, seed_word, must_include)
+			else:
+				words = self._generate_words_within(size, max_chars, seed_word, must_include)
+
+		# Return a properly capitalized and punctuated string.
+		return self.postprocessor.process(words)
+
+	def _start(self, seed_word, must_include):
+		"""Choose the initial key for generating.
+		Return:
+			a tuple of the words the text starts with and the initial key
+		"""
+		start = self.start_state(seed_word, must_include)
+		if start is None:
+			# Randomly select initial key to start generating from (note, key is not included in the actual text)
+			return [], self.random_key()
+
+		# The text starts with the words of a key matching the requested words.
+		key = self.index_keys[start]
+		return key.split(utils.DELIMITER), key
+
+	def _generate_words_within(self, size, max_chars, seed_word = None, must_include = None):
+		"""Generate the list of words for generate when the text is limited to max_chars characters. The length
+		of the text is tracked word by word and the words are cut at the last sentence end that fits the limit.
+		"""
+		for _ in range(BUDGET_RETRIES):
+			words, key = self._start(seed_word, must_include)
+			length = sum(map(self.postprocessor.token_length, words)) - 1  # the first word has no preceding space
+			end = len(words) if words and words[-1].endswith(utils.SENTENCE_END) else 0
+
+			while len(words) < size or end < len(words) or not end:
+				word, key = self.choose_word(words, key)
+				length += self.postprocessor.token_length(word)
+				if length > max_chars:
+					break
+
+				words.append(word)
+				if word.endswith(utils.SENTENCE_END):
+					end = len(words)
+
+			if end:
+				self.stats.incr("words_generated", end)
+				return words[:end]
+
+			# Not a single sentence fit within the limit, try again.
+			self.stats.incr("budget_restarts")
+
+		# rather an empty text than a fragment of a sentence
+		self.stats.incr("budget_failures")
+		return []
+
+	def _generate_words(self, size, complete_sentence, seed_word = None, must_include = None):
+		"""Generate the list of words for generate."""
+		words, key = self._start(seed_word, must_include)
 
 		# Fetch new words until text is of correct length.
+		word = ""
 		while len(words) < size:
-			word, key = self.next_word(key)
+			word, key = self.choose_word(words, key)
 			words.append(word)
 
 		# To complete a sentence, continue adding words until one that ends with a punctuation mark
 		if complete_sentence:
-			while not word.endswith((".", "!", "?", "...", "…")):
-				word, key = self.next_word(key)
+			while not word.endswith(utils.SENTENCE_END):
+				word, key = self.choose_word(words, key)
 				words.append(word)
+				self.stats.incr("sentence_completion_words")
 
-		# Return a properly capitalized and punctuated string.
-		return utils.cleanup(words)
+		self.stats.incr("words_generated", len(words))
+		return words
 
-	def generate_paragraphs(self, size, paragraphs):
+	@locked
+	def generate_paragraphs(self, size, paragraphs, seed_word = None, must_include = None, max_chars = None):
 		"""Generate text of number of paragraphs of given length.
 		Args:
 			size (int): word length of each paragraph
 			paragraphs (int) number of paragraphs
+			seed_word (str): a word the first paragraph should start with
+			must_include (str): a word the first paragraph should contain
+			max_chars (int): maximum length of the whole text in characters, split evenly between paragraphs.
+				Paragraphs in which no sentence fits are left out.
 		"""
+		p_max_chars = paragraph_budget(max_chars, paragraphs)
 		text = []
+		for p_size in self.paragraph_sizes(size, paragraphs):
+			p = self.generate(p_size, True, seed_word, must_include, p_max_chars)
+			text.append(p)
+			seed_word = must_include = None
+
+		return "\n\n".join(p for p in text if p)
+
+	def paragraph_sizes(self, size, paragraphs):
+		"""Randomize word lengths for a number of paragraphs."""
 		# generate paragraph size from a normal distribution using size as the mean
 		# and a fraction of size as the standard deviation
-		for _ in range(paragraphs):
-			p_sigma = max([int(size/3), 5])
-			p_size = int(random.gauss(size, p_sigma))
-			p = self.generate(p_size, True)
-			text.append(p)
+		p_sigma = max([int(size/3), 5])
+		return [int(self.rng.gauss(size, p_sigma)) for _ in range(paragraphs)]
+
+	def choose_word(self, words, key):
+		"""Choose the next word for a text. Unless avoiding overlap with the training data, this is next_word.
+		Otherwise words that would make the last k words a span of the training data are resampled,
+		and if no other successor is found, generating continues from a random key.
+		Args:
+			words (list): the words generated so far
+			key (str): the current key
+		"""
+		word, next_key = self.next_word(key)
+		if self.overlap is None or len(words) < self.overlap.k - 1:
+			return word, next_key
+
+		span = words[len(words) - self.overlap.k + 1:]
+		for _ in range(OVERLAP_RETRIES):
+			if span + [word] not in self.overlap:
+				return word, next_key
 
-		return "\n\n".join(text)
+			self.stats.incr("overlap_resamples")
+			word, next_key = self.next_word(key)
+
+		self.stats.incr("overlap_restarts")
+		return self.next_word(self.random_key())
 
 	def next_word(self, key):
 		"""Given a key to the cache data, chooses a random word successor. Also generates the
 		next key.
 		"""
 		try:
-			word = random.choice(self.cache_data[key])
+			word = self.rng.choice(self.cache_data[key])
 
 			# Compute new key by joining the last n - 2 words of the previous key and the word chosen above
 			key = key.split(utils.DELIMITER)[1:]
@@ -84,19 +265,125 @@ class Generator():
 		# The random nature of the generation algorithm may attempt to use the last n-1 words of the last ngram as a key,
 		# this might not be a valid key. In such case, choose a random key and successor.
 		except KeyError as e:
-			key = random.choice(self.cache_data.keys())
-			word = random.choice(self.cache_data[key])
+			key = self.random_key()
+			word = self.rng.choice(self.cache_data[key])
+			self.stats.incr("key_error_restarts")
 
 		return word, key
 
+	@locked
+	def start_state(self, seed_word = None, must_include = None):
+		"""Use the word index to choose a random key beginning with seed_word and containing must_include.
+		Return:
+			position of the key in the table, or None if neither word is given
+		Raise:
+			ValueError if no key matches the words
+		"""
+		if seed_word is None and must_include is None:
+			return None
+
+		index = self.get_index()
+		if seed_word is not None:
+			candidates = index["starts"].get(seed_word, [])
+			if must_include is not None:
+				containing = set(index["contains"].get(must_include, []))
+				candidates = [i for i in candidates if i in containing]
+		else:
+			candidates = index["contains"].get(must_include, [])
+
+		if not candidates:
+			conditions = []
+			if seed_word is not None:
+				conditions.append("starts with '{}'".format(seed_word))
+			if must_include is not None:
+				conditions.append("contains '{}'".format(must_include))
+			msg = "No key in the model {}".format(" and ".join(conditions))
+			raise ValueError(msg)
+
+		return candidates[self.randrange(len(candidates))]
+
+	def get_index(self):
+		"""Get the word index of the model. Models without an index section are indexed from the keys
+		of the cache data on first use.
+		"""
+		if self.index is None:
+			with self.stats.phase("load_index"):
+				try:
+					self.index = model.load_index(self.model_path)
+				except (FileNotFoundError, ValueError):
+					self.index = None
+
+				if self.index is None:
+					self.index = model.build_index(self.cache_data)
+				self.index_keys = self.get_keys()
+
+		return self.index
+
+	def get_overlap_filter(self):
+		"""Load the Bloom filter of the training data spans from the model."""
+		try:
+			data = model.read_section(self.model_path, "overlap")
+		except ValueError:
+			msg = "Model {} has no overlap filter, train it with --overlap".format(self.path_to_cache_file)
+			raise ValueError(msg)
+
+		return bloom.BloomFilter.from_bytes(data)
+
 	def get_cache_data(self):
 		"""Get the contents of the cache file as a dictionary."""
 		try:
-			with open(self.path_to_cache_file) as f:
-				train_data = json.load(f)
-				return train_data
+			return model.load_table(self.model_path)
 		except FileNotFoundError:
 			msg = "Invalid model: {}".format(self.path_to_cache_file)
 			raise FileNotFoundError(msg)
 
+	def model_changed(self):
+		"""Check whether a new version of the model has been published since it was loaded."""
+		path = model.resolve_version(self.path_to_cache_file)
+		return path != self.model_path or model.stamp(path) != self.model_stamp
+
+	def reload(self, force = False):
+		"""Load the published version of the model if it has changed and swap it in. The model is loaded
+		without holding the lock, so generating in other threads only waits for the swap.
+		Args:
+			force (boolean): reload even if the model has not changed
+		Return:
+			True if the model was reloaded
+		"""
+		if not force and not self.model_changed():
+			return False
+
+		with self.stats.phase("reload"):
+			fresh = type(self)(self.cache_file, avoid_overlap=self.overlap is not None, style=self.style)
+
+		with self.lock:
+			for name in self.MODEL_ATTRIBUTES:
+				setattr(self, name, getattr(fresh, name))
+		self.stats.incr("reloads")
+		return True
+
+	def start_reloader(self, interval = 60):
+		"""Start a background thread checking for a new version of the model every interval seconds."""
+		self.stop_reloader()
+		stop = threading.Event()
+		thread = threading.Thread(target=self._reload_loop, args=(interval, stop), name="model-reloader", daemon=True)
+		self.reloader = (thread, stop)
+		thread.start()
+
+	def stop_reloader(self):
+		"""Stop the background reloader thread, if running."""
+		if self.reloader is not None:
+			thread, stop = self.reloader
+			stop.set()
+			thread.join()
+			self.reloader = None
+
+	def _reload_loop(self, interval, stop):
+		while not stop.wait(interval):
+			try:
+				self.reload()
+			except (FileNotFoundError, ValueError):
+				# eg. a model removed or replaced with an invalid file, keep generating with the current one
+				self.stats.incr("reload_errors")
+
 
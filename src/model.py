@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compiled model file format. A model in data/cache consists of a fixed size binary header followed by
+named sections:
+	magic (4 bytes) and format version,
+	ngram size n,
+	number of keys (states), distinct words (vocabulary) and ngrams (successor entries),
+	sha256 checksum of the training data the model was built from,
+	a table of up to MAX_SECTIONS sections as name, offset, length and crc32 of the section contents.
+
+The successor dictionary itself is stored as a json section named "table". Since the header has a fixed
+size, tools can inspect a model and check whether it is stale by reading only the first HEADER_SIZE bytes.
+
+An optional "index" section maps each word to the positions of the keys in the table that begin with it
+("starts") and that contain it ("contains"). This lets a generator pick a key for a given word without
+scanning the table.
+
+Models written before the compiled format are plain json files, these are still readable with load_table.
+
+Models are published atomically. A ModelWriter writes a new versioned file next to the model, eg.
+fairytales.v3.dat for fairytales.dat, and only once it is complete replaces the model with a hard link to it
+using a rename. Processes loading the model therefore see either the previous or the new version, never a
+partially written file. A generator resolves the model to its versioned file when loading it, see
+resolve_version, so sections it reads later come from the same version. The KEEP_VERSIONS latest versions
+are kept.
+"""
+
+import os
+import re
+import glob
+import shutil
+import struct
+import zlib
+import hashlib
+import collections
+import simplejson as json  # faster decoding than the standard library module
+
+from src import utils
+
+
+MAGIC = b"MKVM"
+VERSION = 1
+MAX_SECTIONS = 8
+KEEP_VERSIONS = 3  # number of versioned files to keep for each model
+
+_HEADER = struct.Struct("<4sHHQQQ32sH")
+_SECTION = struct.Struct("<8sQQI")
+HEADER_SIZE = _HEADER.size + MAX_SECTIONS * _SECTION.size
+
+Header = collections.namedtuple("Header", "version order states vocabulary ngrams checksum sections")
+Section = collections.namedtuple("Section", "offset length crc")
+
+
+def read_header(path):
+	"""Read and parse the header of a compiled model.
+	Return:
+		a Header
+	Raise:
+		ValueError if the file is not a compiled model of a supported version
+	"""
+	with open(path, "rb") as f:
+		data = f.read(HEADER_SIZE)
+
+	if len(data) < HEADER_SIZE or data[:len(MAGIC)] != MAGIC:
+		raise ValueError("Not a compiled model: {}".format(path))
+
+	magic, version, order, states, vocabulary, ngrams, checksum, nsections = _HEADER.unpack_from(data)
+	if version != VERSION:
+		raise ValueError("Unsupported model version {} in {}".format(version, path))
+
+	sections = collections.OrderedDict()
+	for i in range(nsections):
+		name, offset, length, crc = _SECTION.unpack_from(data, _HEADER.size + i * _SECTION.size)
+		sections[name.rstrip(b"\0").decode()] = Section(offset, length, crc)
+
+	return Header(version, order, states, vocabulary, ngrams, checksum.hex(), sections)
+
+def read_section(path, name, header=None, size=None):
+	"""Read the raw contents of a named section, or only its first size bytes."""
+	if header is None:
+		header = read_header(path)
+
+	try:
+		section = header.sections[name]
+	except KeyError:
+		raise ValueError("No section {} in model {}".format(name, path))
+
+	with open(path, "rb") as f:
+		f.seek(section.offset)
+		return f.read(section.length if size is None else min(size, section.length))
+
+def validate(path):
+	"""Check the header and the crc32 of each section of a compiled model.
+	Return:
+		the Header
+	Raise:
+		ValueError if the model is invalid
+	"""
+	header = read_header(path)
+	for name in header.sections:
+		data = read_section(path, name, header)
+		if len(data) != header.sections[name].length or zlib.crc32(data) != header.sections[name].crc:
+			raise ValueError("Corrupted section {} in model {}".format(name, path))
+
+	return header
+
+def is_legacy(path):
+	"""Check whether path is a plain json model written before the compiled format."""
+	with open(path, "rb") as f:
+		return f.read(1) == b"{"
+
+def load_table(path, header=None):
+	"""Load the successor dictionary of a compiled or a legacy json model."""
+	if is_legacy(path):
+		with open(path) as f:
+			return json.load(f)
+
+	return json.loads(read_section(path, "table", header))
+
+def load_index(path, header=None):
+	"""Load the word index of a model.
+	Return:
+		the index as a dictionary, or None if the model has no index section
+	"""
+	if is_legacy(path):
+		return None
+
+	if header is None:
+		header = read_header(path)
+	if "index" not in header.sections:
+		return None
+
+	return json.loads(read_section(path, "index", header))
+
+def build_index(keys):
+	"""Build a word index from an iterable of table keys."""
+	builder = IndexBuilder()
+	for key in keys:
+		builder.add(key)
+
+	return builder.index
+
+def file_checksum(path):
+	"""Compute the sha256 checksum of a file as a hex string."""
+	sha = hashlib.sha256()
+	with open(path, "rb") as f:
+		for block in iter(lambda: f.read(2**20), b""):
+			sha.update(block)
+
+	return sha.hexdigest()
+
+
+
+def _versions(path):
+	"""List the version numbers and versioned files of a model, oldest first."""
+	root, ext = os.path.splitext(path)
+	pattern = re.compile(re.escape(root) + r"\.v(\d+)" + re.escape(ext) + "$")
+	versions = []
+	for version_path in glob.glob(glob.escape(root) + ".v*" + ext):
+		match = pattern.match(version_path)
+		if match:
+			versions.append((int(match.group(1)), version_path))
+
+	return sorted(versions)
+
+def version_paths(path):
+	"""List the versioned files of a model, oldest first."""
+	return [version_path for _, version_path in _versions(path)]
+
+def resolve_version(path):
+	"""Find the versioned file currently published as the model in path.
+	Return:
+		path to the versioned file, or path itself if it is not a published version (eg. a legacy model)
+	"""
+	try:
+		stat = os.stat(path)
+	except FileNotFoundError:
+		return path
+
+	for version_path in reversed(version_paths(path)):
+		try:
+			if os.path.samestat(stat, os.stat(version_path)):
+				return version_path
+		except FileNotFoundError:  # removed by a concurrent publish
+			continue
+
+	return path
+
+def stamp(path):
+	"""Identify the file in path by its inode, modification time and size, None if it does not exist."""
+	try:
+		stat = os.stat(path)
+	except FileNotFoundError:
+		return None
+
+	return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def create_version(path):
+	"""Create the next versioned file of a model for writing.
+	Return:
+		a tuple of the opened file and its path
+	"""
+	versions = _versions(path)
+	root, ext = os.path.splitext(path)
+	number = versions[-1][0] if versions else 0
+	while True:
+		number += 1
+		version_path = "{}.v{}{}".format(root, number, ext)
+		try:
+			return open(version_path, "xb"), version_path
+		except FileExistsError:  # claimed by a concurrent writer
+			continue
+
+def publish(version_path, path):
+	"""Atomically replace the model in path with a complete versioned file and remove old versions."""
+	tmp_path = "{}.{}.tmp".format(path, os.getpid())
+	try:
+		os.link(version_path, tmp_path)
+	except OSError:  # no hard links on this file system
+		shutil.copyfile(version_path, tmp_path)
+	os.replace(tmp_path, path)
+
+	for old_path in version_paths(path)[:-KEEP_VERSIONS]:
+		try:
+			os.remove(old_path)
+		except FileNotFoundError:
+			pass
+
+
+
+class IndexBuilder():
+	"""Incrementally builds the word index of a table from its keys in table order."""
+
+	def __init__(self):
+		self.starts = collections.defaultdict(list)
+		self.contains = collections.defaultdict(list)
+		self.size = 0
+
+	def add(self, key):
+		"""Add the next key of the table to the index."""
+		words = key.split(utils.DELIMITER)
+		self.starts[words[0]].append(self.size)
+		for word in dict.fromkeys(words):  # each distinct word once, in order
+			self.contains[word].append(self.size)
+		self.size += 1
+
+	@property
+	def index(self):
+		return {"starts": self.starts, "contains": self.contains}
+
+
+class _SectionFile():
+	"""File like wrapper for writing the contents of a section, keeps track of its length and crc32."""
+
+	def __init__(self, f):
+		self.f = f
+		self.length = 0
+		self.crc = 0
+
+	def write(self, data):
+		if isinstance(data, str):
+			data = data.encode("utf8")
+		self.f.write(data)
+		self.length += len(data)
+		self.crc = zlib.crc32(data, self.crc)
+
+
+class ModelWriter():
+	"""Writes a compiled model. Sections are streamed to a new versioned file as they are written, the header
+	is written last when the model is closed and the version is then published as the model in path.
+
+	Usage:
+		with ModelWriter(path, n, checksum) as writer:
+			writer.write_section("table", data)
+			writer.states = ...
+	"""
+
+	def __init__(self, path, order, checksum):
+		self.path = path
+		self.order = order
+		self.checksum = checksum
+		self.states = 0
+		self.vocabulary = 0
+		self.ngrams = 0
+		self.sections = collections.OrderedDict()
+		self.f = None
+		self.version_path = None
+
+	def __enter__(self):
+		self.f, self.version_path = create_version(self.path)
+		self.f.write(b"\0" * HEADER_SIZE)  # placeholder until the section offsets are known
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		complete = False
+		try:
+			if exc_type is None:
+				self.f.seek(0)
+				self.f.write(self.pack_header())
+				self.f.flush()
+				os.fsync(self.f.fileno())
+				complete = True
+		finally:
+			self.f.close()
+			if not complete:
+				os.remove(self.version_path)
+
+		if complete:
+			publish(self.version_path, self.path)
+
+	def section(self, name):
+		"""Start a new section and return a file like object for writing its contents."""
+		if len(self.sections) >= MAX_SECTIONS:
+			raise RuntimeError("Too many sections, a model can contain at most {}".format(MAX_SECTIONS))
+
+		section = _SectionFile(self.f)
+		self.sections[name] = (self.f.tell(), section)
+		return section
+
+	def write_section(self, name, data):
+		"""Write a section from a bytes or a str object."""
+		self.section(name).write(data)
+
+	def pack_header(self):
+		"""Pack the header and the section table to bytes."""
+		header = _HEADER.pack(MAGIC, VERSION, self.order, self.states, self.vocabulary, self.ngrams,
+			bytes.fromhex(self.checksum), len(self.sections))
+
+		for name, (offset, section) in self.sections.items():
+			header += _SECTION.pack(name.encode(), offset, section.length, section.crc)
+
+		return header.ljust(HEADER_SIZE, b"\0")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NumPy backed generator. Compiles the successor dictionary of a .dat file in data/cache into CSR style arrays:
+	offsets: successors of state i are stored in the range offsets[i]:offsets[i+1] of the arrays below,
+	successors: vocabulary id of each distinct successor word,
+	cumulative: running total of successor counts over all states,
+	next_state: the state reached by choosing the successor, or -1 if it is not a valid key.
+
+Since cumulative is a single running total, a random successor for any number of states can be chosen
+at once with a single searchsorted call. This makes it possible to advance many chains, eg. all the
+paragraphs of a generate_paragraphs call, in vectorized batches.
+
+Requires numpy, which is an optional dependency.
+"""
+
+import collections
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+from src import generator
+from src import utils
+
+
+
+class NumpyGenerator(generator.Generator):
+
+	CHUNK_SIZE = 256  # large enough for vectorized batches to outrun the python engine
+
+	MODEL_ATTRIBUTES = generator.Generator.MODEL_ATTRIBUTES + ("vocab", "offsets", "successors", "cumulative",
+		"next_state", "is_sentence_end", "token_lengths", "state_base")
+
+	def __init__(self, cache_file, profile = False, seed = None, avoid_overlap = False, style = "default"):
+		"""Load the cache file and compile it to arrays."""
+		if np is None:
+			raise ImportError("NumpyGenerator requires numpy, install it with: pip install numpy")
+
+		super().__init__(cache_file, profile, seed, avoid_overlap, style)
+		with self.stats.phase("compile"):
+			self.compile()
+
+	def compile(self):
+		"""Compile self.cache_data into vocabulary and state arrays."""
+		states = list(self.cache_data)
+		state_ids = {key: i for i, key in enumerate(states)}
+		word_ids = {}
+
+		offsets = [0]
+		successors = []
+		counts = []
+		next_state = []
+		for key in states:
+			prefix = key.split(utils.DELIMITER)[1:]
+			# Duplicate successors are stored once with their count as weight.
+			for word, count in collections.Counter(self.cache_data[key]).items():
+				successors.append(word_ids.setdefault(word, len(word_ids)))
+				counts.append(count)
+				next_state.append(state_ids.get(utils.DELIMITER.join(prefix + [word]), -1))
+			offsets.append(len(successors))
+
+		self.vocab = list(word_ids)
+		self.offsets = np.array(offsets, dtype=np.int64)
+		self.successors = np.array(successors, dtype=np.int32)
+		self.cumulative = np.cumsum(np.array(counts, dtype=np.int64))
+		self.next_state = np.array(next_state, dtype=np.int32)
+		self.is_sentence_end = np.array([word.endswith(utils.SENTENCE_END) for word in self.vocab], dtype=bool)
+		self.token_lengths = np.array([self.postprocessor.token_length(word) for word in self.vocab], dtype=np.int64)
+
+		# running total before the first successor of each state
+		self.state_base = np.concatenate(([0], self.cumulative))[self.offsets]
+
+	def seed(self, seed):
+		"""(Re)initialize the NumPy random number generator of this generator."""
+		self.rng = np.random.default_rng(seed)
+
+	def randrange(self, n):
+		"""Choose a random integer in range(n)."""
+		return int(self.rng.integers(n))
+
+	def paragraph_sizes(self, size, paragraphs):
+		"""Randomize word lengths for a number of paragraphs. See Generator.paragraph_sizes."""
+		p_sigma = max([int(size/3), 5])
+		return self.rng.normal(size, p_sigma, paragraphs).astype(int).tolist()
+
+	def step(self, states):
+		"""Choose a random successor for each state in an array of states.
+		Return:
+			a tuple of the chosen word ids and the next states
+		"""
+		base = self.state_base[states]
+		totals = self.state_base[states + 1] - base
+		targets = base + (self.rng.random(len(states)) * totals).astype(np.int64)
+		idx = np.searchsorted(self.cumulative, targets, side="right")
+
+		words = self.successors[idx]
+		next_states = self.next_state[idx]
+
+		# As with Generator.next_word, restart from a random state when the next n-1 words are not a valid key.
+		dead_ends = np.flatnonzero(next_states < 0)
+		if dead_ends.size:
+			next_states[dead_ends] = self.rng.integers(0, len(self.offsets) - 1, dead_ends.size)
+			self.stats.incr("key_error_restarts", int(dead_ends.size))
+
+		return words, next_states
+
+	def sample(self, chains, steps):
+		"""Generate word ids for a number of independent chains.
+		Args:
+			chains (int): number of chains to generate
+			steps (int): number of words in each chain
+		Return:
+			a (chains, steps) array of vocabulary ids
+		"""
+		ids = self.generate_ids([steps] * chains, False)
+		return np.array(ids, dtype=np.int32).reshape(chains, steps)
+
+	def generate_ids(self, sizes, complete_sentence, starts = (), budgets = None):
+		"""Generate a chain of word ids for each size in sizes. All chains are advanced in a single batch.
+		Args:
+			sizes (list): number of words for each chain
+			complete_sentence (boolean): whether to continue each chain past its size until a sentence end
+			starts (list): initial states for the first chains, the rest start from a random state
+			budgets (list): maximum rendered length in characters of each chain. Chains are ended at the last
+				complete sentence within their budget, chains without one are generated again.
+		Return:
+			list of word id lists, None for chains without a complete sentence within their budget after
+			BUDGET_RETRIES attempts
+		"""
+		sizes = np.maximum(np.asarray(sizes, dtype=np.int64), 0)
+		start_states = np.full(len(sizes), -1, dtype=np.int64)
+		start_states[:len(starts)] = starts
+		if budgets is None:
+			rows, lengths, _ = self._run_chains(sizes, complete_sentence, start_states)
+			self.stats.incr("words_generated", int(lengths.sum()))
+			self.stats.incr("sentence_completion_words", int((lengths - np.minimum(lengths, sizes)).sum()))
+			return [row[:n] for row, n in zip(rows, lengths.tolist())]
+
+		budgets = np.asarray(budgets, dtype=np.int64)
+		result = [None] * len(sizes)
+		pending = np.arange(len(sizes))
+		for _ in range(generator.BUDGET_RETRIES):
+			rows, lengths, ends = self._run_chains(sizes[pending], True, start_states[pending], budgets[pending])
+			for i, row, end in zip(pending.tolist(), rows, ends.tolist()):
+				if end:
+					result[i] = row[:end]
+
+			pending = pending[ends == 0]
+			if not pending.size:
+				break
+			self.stats.incr("budget_restarts", int(pending.size))
+
+		self.stats.incr("budget_failures", int(pending.size))
+		self.stats.incr("words_generated", sum(len(ids) for ids in result if ids is not None))
+		return result
+
+	def _run_chains(self, sizes, complete_sentence, start_states, budgets = None):
+		"""Advance a batch of chains until each reaches its size (and a sentence end if complete_sentence
+		is set) or its character budget.
+		Return:
+			a tuple of the word id rows, the number of words in each row and the number of words up to
+			the last sentence end in each row
+		"""
+		chains = len(sizes)
+		states = np.where(start_states >= 0, start_states, self.rng.integers(0, len(self.offsets) - 1, chains))
+		buf = np.empty((chains, max(int(sizes.max(initial=0)), 1)), dtype=np.int32)
+		pos = np.zeros(chains, dtype=np.int64)
+		ends = np.zeros(chains, dtype=np.int64)
+		if budgets is not None:
+			lengths = np.full(chains, -1, dtype=np.int64)  # the first word has no preceding space
+			exhausted = np.zeros(chains, dtype=bool)
+
+		while True:
+			active = pos < sizes
+			if complete_sentence:
+				active |= (ends < pos) | (ends == 0)
+			if budgets is not None:
+				active &= ~exhausted
+			idx = np.flatnonzero(active)
+			if not idx.size:
+				break
+
+			# grow the buffer when sentence completion runs past its width
+			if pos[idx].max() >= buf.shape[1]:
+				buf = np.concatenate((buf, np.empty_like(buf)), axis=1)
+
+			words, next_states = self.step(states[idx])
+			if self.overlap is not None:
+				self.resample_overlap(buf, pos, states, idx, words, next_states)
+
+			if budgets is not None:
+				# Track the rendered length and end chains whose next word would not fit.
+				new_lengths = lengths[idx] + self.token_lengths[words]
+				fits = new_lengths <= budgets[idx]
+				exhausted[idx[~fits]] = True
+				idx, words, next_states = idx[fits], words[fits], next_states[fits]
+				lengths[idx] = new_lengths[fits]
+
+			states[idx] = next_states
+			buf[idx, pos[idx]] = words
+			pos[idx] += 1
+			sentence_ends = self.is_sentence_end[words]
+			ends[idx[sentence_ends]] = pos[idx[sentence_ends]]
+
+		return buf.tolist(), pos, ends
+
+	def resample_overlap(self, buf, pos, states, idx, words, next_states):
+		"""Resample words that would make the last k words of a chain a span of the training data,
+		see Generator.choose_word. words and next_states are updated in place.
+		"""
+		k = self.overlap.k
+		for _ in range(generator.OVERLAP_RETRIES):
+			copied = np.array([p >= k - 1 and [self.vocab[i] for i in buf[c, p-k+1:p]] + [self.vocab[w]] in self.overlap
+				for c, p, w in zip(idx.tolist(), pos[idx].tolist(), words.tolist())], dtype=bool)
+			if not copied.any():
+				return
+
+			self.stats.incr("overlap_resamples", int(copied.sum()))
+			words[copied], next_states[copied] = self.step(states[idx[copied]])
+
+		# where no other successor was found, replace the word with a successor of a random state
+		self.stats.incr("overlap_restarts", int(copied.sum()))
+		random_states = self.rng.integers(0, len(self.offsets) - 1, int(copied.sum()))
+		words[copied], next_states[copied] = self.step(random_states)
+
+	def start_words(self, seed_word, must_include):
+		"""Resolve the initial state for seed_word and must_include using the word index.
+		Return:
+			a tuple of the words of the initial key and a list containing the initial state, both
+			empty if neither word is given
+		"""
+		start = self.start_state(seed_word, must_include)
+		if start is None:
+			return [], []
+
+		return self.index_keys[start].split(utils.DELIMITER), [start]
+
+	@generator.locked
+	def generate(self, size = 25, complete_sentence = False, seed_word = None, must_include = None, max_chars = None):
+		"""Generates a string of size words. See Generator.generate."""
+		with self.stats.phase("generate"):
+			prefix, starts = self.start_words(seed_word, must_include)
+			budgets = None if max_chars is None else [self.prefix_budget(prefix, max_chars)]
+			ids = self.generate_ids([size - len(prefix)], complete_sentence, starts, budgets)[0]
+
+		return self.render(ids, prefix)
+
+	@generator.locked
+	def generate_paragraphs(self, size, paragraphs, seed_word = None, must_include = None, max_chars = None):
+		"""Generate text of number of paragraphs of given length. See Generator.generate_paragraphs."""
+		p_max_chars = generator.paragraph_budget(max_chars, paragraphs)
+		with self.stats.phase("generate"):
+			prefix, starts = self.start_words(seed_word, must_include)
+			sizes = self.paragraph_sizes(size, paragraphs)
+			budgets = None
+			if sizes:
+				sizes[0] -= len(prefix)
+				if max_chars is not None:
+					budgets = [self.prefix_budget(prefix, p_max_chars)] + [p_max_chars] * (paragraphs - 1)
+			chains = self.generate_ids(sizes, True, starts, budgets)
+
+		text = [self.render(ids, prefix if i == 0 else ()) for i, ids in enumerate(chains)]
+		return "\n\n".join(p for p in text if p)
+
+	def render(self, ids, prefix = ()):
+		"""Render a chain of word ids as text, or an empty text for a chain that did not fit its budget."""
+		if ids is None:
+			return ""
+
+		return self.postprocessor.process_ids(ids, self.vocab, prefix)
+
+	def prefix_budget(self, prefix, max_chars):
+		"""Character budget left for generated words after the words of the initial key."""
+		if not prefix:
+			return max_chars
+
+		return max_chars - sum(map(self.postprocessor.token_length, prefix))
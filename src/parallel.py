@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Parallel generation. Splits a large generate_paragraphs request into fixed size chunks of paragraphs
+and generates the chunks in a pool of worker processes.
+
+Each chunk is generated with its own seed spawned from a single root seed. The chunk size is set by the
+generator class, see Generator.CHUNK_SIZE, so the NumPy engine can generate large vectorized batches. Since
+chunk sizes do not depend on the number of workers and results are collected in chunk order, a given seed always
+produces the same text regardless of the number of workers.
+
+The model is loaded once in the parent process. Where available, workers are forked from the parent and
+share its memory pages copy-on-write instead of each loading their own copy of the model.
+"""
+
+import multiprocessing
+
+from src import utils
+from src import profiler
+from src import generator
+
+# The generator shared with forked worker processes.
+_generator = None
+
+
+def _init_worker(generator_class, cache_file, profile, avoid_overlap, style):
+	"""Pool initializer for start methods other than fork: load the model in the worker process."""
+	global _generator
+	_generator = generator_class(cache_file, profile, avoid_overlap=avoid_overlap, style=style)
+
+def _generate_chunk(gen, size, paragraphs, seed, seed_word=None, must_include=None, max_chars=None):
+	"""Generate a chunk of paragraphs using a seeded generator.
+	Return:
+		a tuple of the generated text and the counters recorded while generating
+	"""
+	gen.seed(seed)
+	gen.stats = profiler.Stats(enabled=gen.stats.enabled)
+	text = gen.generate_paragraphs(size, paragraphs, seed_word, must_include, max_chars)
+	return text, gen.stats
+
+def _run_chunk(args):
+	"""Worker entrypoint: generate a chunk with the process level generator."""
+	return _generate_chunk(_generator, *args)
+
+def generate_paragraphs(gen, size, paragraphs, workers=1, seed=None, seed_word=None, must_include=None, max_chars=None):
+	"""Generate paragraphs using a number of worker processes.
+	Args:
+		gen (Generator): a generator with a loaded model
+		size (int): word length of each paragraph
+		paragraphs (int): number of paragraphs
+		workers (int): number of worker processes, 1 to generate in the current process
+		seed (int): root seed, None for non reproducible output
+		seed_word (str): a word the first paragraph should start with
+		must_include (str): a word the first paragraph should contain
+		max_chars (int): maximum length of the whole text in characters
+	Return:
+		the generated paragraphs as a single string
+	"""
+	global _generator
+
+	chunk_size = gen.CHUNK_SIZE
+	chunks = [min(chunk_size, paragraphs - i) for i in range(0, paragraphs, chunk_size)]
+	seeds = utils.spawn_seeds(seed, len(chunks))
+	# Split the character limit between chunks in proportion to their paragraphs.
+	tasks = []
+	for i, (chunk, chunk_seed) in enumerate(zip(chunks, seeds)):
+		chunk_max_chars = None
+		if max_chars is not None:
+			chunk_max_chars = generator.paragraph_budget(max_chars, paragraphs) * chunk + len("\n\n") * (chunk - 1)
+		words = (seed_word, must_include) if i == 0 else (None, None)
+		tasks.append((size, chunk, chunk_seed) + words + (chunk_max_chars,))
+	stats = gen.stats
+
+	if workers <= 1:
+		results = [_generate_chunk(gen, *task) for task in tasks]
+	else:
+		if "fork" in multiprocessing.get_all_start_methods():
+			_generator = gen
+			pool = multiprocessing.get_context("fork").Pool(workers)
+		else:
+			pool = multiprocessing.Pool(workers, _init_worker, (type(gen), gen.cache_file, stats.enabled, gen.overlap is not None,
+				gen.style))
+
+		with stats.phase("parallel_generate"):
+			with pool:
+				results = pool.map(_run_chunk, tasks)
+		_generator = None
+
+	# merge worker statistics back to the generator
+	for _, chunk_stats in results:
+		for name, seconds in chunk_stats.timings.items():
+			stats.add_time(name, seconds)
+		for name, value in chunk_stats.counters.items():
+			stats.incr(name, value)
+	gen.stats = stats
+
+	return "\n\n".join(text for text, _ in results if text)
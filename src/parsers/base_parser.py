@@ -6,11 +6,14 @@ import glob
 import os.path
 
 from src import utils
+from src import tokenizer
 
 
 class BaseParser(abc.ABC):
 	"""Base class for parsers."""
 
+	tokenizer = tokenizer.Tokenizer(space_punctuation=True)
+
 	def __init__(self, ofile):
 		"""Setup path to output file where the result should be saved."""
 		self.path_to_ofile = os.path.join(utils.BASE, "data", "training", ofile)
@@ -43,16 +46,4 @@ class BaseParser(abc.ABC):
 
 	def cleanup(self):
 		"""Cleanup the content string: add missing space after puncutation."""
-		for word in self.content.split():
-
-			if len(word) > 3:
-				# add missing space after period if not an email or url 
-				if "." in word and not any([c in word for c in ("@", "http", "...", "www")]):
-					new_word = word.replace(".", ". ").rstrip()
-					self.content = self.content.replace(word, new_word)
-
-				# for other characters, add the space and strip any extra space at the end
-				for char in (",", "!", "?"):
-					if char in word:
-						new_word = word.replace(char, char + " ").rstrip()
-						self.content = self.content.replace(word, new_word)
\ No newline at end of file
+		self.content = self.tokenizer.normalize(self.content)
\ No newline at end of file
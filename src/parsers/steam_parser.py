@@ -18,6 +18,11 @@ import requests
 from bs4 import BeautifulSoup
 from src.parsers import base_parser
 from src import utils
+from src import dedup
+from src import tokenizer
+
+
+DESCRIPTION_TOKENIZER = tokenizer.Tokenizer(drop=("http://", "https://"))
 
 
 class SteamParser(base_parser.BaseParser):
@@ -35,14 +40,18 @@ class SteamParser(base_parser.BaseParser):
 		smaller parsed appids than self.sample.
 		"""
 		descriptions = []
+		deduplicator = dedup.Deduplicator()
 		for appid in self.sample:
 			description = self.get_app_description(appid)
 			# description is None if appid didn't match a valid game filter
 			if description:
 				description = self.filter_description(description)
-				descriptions.append(description)
+				# skip repeated store descriptions, eg. of DLCs sharing the description of the base game
+				if not deduplicator.is_duplicate(description):
+					descriptions.append(description)
 
-		print("Parsed {} descriptions".format(len(descriptions)))
+		print("Parsed {} descriptions, skipped {} duplicates and {} near duplicates".format(
+			len(descriptions), deduplicator.exact_duplicates, deduplicator.near_duplicates))
 		self.content = " ".join(descriptions)
 
 	def get_app_id_list(self):
@@ -98,6 +107,4 @@ class SteamParser(base_parser.BaseParser):
 
 	def filter_description(self, description):
 		"""Remove urls from description."""
-		split = description.split()
-		text = " ".join( [word for word in split if not any(item in word for item in ("http://", "https://"))] )
-		return text
\ No newline at end of file
+		return DESCRIPTION_TOKENIZER.join(description)
\ No newline at end of file
@@ -6,6 +6,7 @@ import os.path
 
 from src.parsers import base_parser
 from src import utils
+from src import tokenizer
 
 
 class TextParser(base_parser.BaseParser):
@@ -26,7 +27,7 @@ class TextParser(base_parser.BaseParser):
 		combined_words = []
 		for file_ in files:
 			with codecs.open(file_, encoding="utf8") as f:
-				word_list = f.read().split()
+				word_list = tokenizer.DEFAULT.tokens(f.read())
 				combined_words.extend(word_list)
 
 		self.content = " ".join(combined_words)
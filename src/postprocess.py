@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Post-processing of generated text. A PostProcessor turns a list of generated words into the final text:
+it capitalizes the first word, strips leading dashes and trailing punctuation and removes characters
+such as parentheses and quotes which are difficult to properly handle in random text.
+
+All single character replacements are compiled to one translate table and all rules spanning several
+characters, such as replacing an opening parenthesis and the space before it with a comma, to one regex.
+The text is rendered with a single join, regex and translate pass regardless of the number of rules.
+
+Profiles extend the default processing, eg. the tweet profile also removes "@" to avoid mentioning users.
+Profiles must not make the text longer than the default processing: token_length, used for generating
+within a character limit, is an upper bound of the length each word adds to the text.
+"""
+
+import re
+
+
+# Single characters replaced by the default processing.
+TRANSLATIONS = {
+	"(": "",  # in case the first character of a sentence is "("
+	")": "",
+	"\"": "",
+	"“": "",
+	"”": "",
+	"•": "",
+	"●": "",
+	"—": "",
+	"…": "...",
+}
+
+# Patterns replaced by the default processing as (regex, replacement) pairs.
+RULES = [
+	(r" \(", ","),  # replace an opening parenthesis with a comma
+]
+
+LEADING_CHARS = " -*"
+TRAILING_CHARS = ",;:- "
+
+
+
+class PostProcessor():
+
+	def __init__(self, delete = "", rules = ()):
+		"""Compile the translate table and the regex of a profile.
+		Args:
+			delete (str): characters to remove in addition to the default ones
+			rules (list): (regex, replacement) pairs to apply in addition to the default rules. Replacements
+				are literal strings, rules are matched against the text before characters are translated.
+		"""
+		translations = dict(TRANSLATIONS, **dict.fromkeys(delete, ""))
+		self.table = str.maketrans(translations)
+
+		rules = RULES + list(rules)
+		self.replacements = {"r{}".format(i): replacement for i, (_, replacement) in enumerate(rules)}
+		self.pattern = re.compile("|".join("(?P<r{}>{})".format(i, regex) for i, (regex, _) in enumerate(rules)))
+
+	def _replace(self, match):
+		return self.replacements[match.lastgroup]
+
+	def process(self, tokens):
+		"""Render a list of words as text.
+		Arg:
+			tokens (list): the words of the text
+		Return:
+			the processed text
+		"""
+		if not tokens:
+			return ""
+
+		# Capitalize the first word (calling capitalize() on the whole string would decapitalize everything else).
+		text = " ".join([tokens[0].capitalize().strip()] + tokens[1:])
+		text = text.lstrip(LEADING_CHARS)
+		text = self.pattern.sub(self._replace, text).translate(self.table)
+		return text.rstrip(TRAILING_CHARS)
+
+	def process_ids(self, ids, vocab, prefix = ()):
+		"""Render a text of vocabulary ids, eg. generated by the NumPy engine.
+		Args:
+			ids (iterable): vocabulary ids of the words of the text
+			vocab (list): the vocabulary
+			prefix (list): words preceding the words of ids
+		"""
+		return self.process(list(prefix) + [vocab[i] for i in ids])
+
+	def token_length(self, token):
+		"""Compute the length of a word in the processed text, including the space preceding it (or the comma
+		replacing the space and an opening parenthesis). This is an upper bound since the start and the end
+		of the text are also stripped, and it covers the word being capitalized as the first word of the text.
+		"""
+		length = len(token.translate(self.table))
+		if not token.isascii():  # capitalizing can make a word longer, eg. "ß" to "Ss"
+			length = max(length, len(token.capitalize().translate(self.table)))
+
+		return length + 1
+
+
+DEFAULT = PostProcessor()
+
+PROFILES = {
+	"default": DEFAULT,
+	"tweet": PostProcessor(delete="@"),  # no mentions
+	"poem": PostProcessor(rules=[(r"(?<=[,;:.!?…]) ", "\n")]),  # a line break after each clause
+}
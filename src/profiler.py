@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in instrumentation for trainers and generators. A Stats object records the wall clock time
+spent in named phases (eg. read, tokenize, count), event counters (eg. KeyError restarts during
+generation) and the peak memory usage of the process.
+
+A disabled Stats object is a cheap no-op so the instrumentation calls can stay in the hot paths.
+"""
+
+import sys
+import time
+import collections
+import contextlib
+
+try:
+	import resource
+except ImportError:  # not available on Windows
+	resource = None
+
+
+
+class Stats():
+
+	def __init__(self, enabled=True):
+		self.enabled = enabled
+		self.timings = collections.OrderedDict()  # phase name: accumulated seconds
+		self.counters = collections.Counter()
+		self.peak_memory = None  # peak resident set size in bytes
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		"""Context manager for timing a named phase. Repeated phases with the same name are accumulated."""
+		if not self.enabled:
+			yield
+			return
+
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add_time(name, time.perf_counter() - start)
+			self.update_peak_memory()
+
+	def add_time(self, name, seconds):
+		"""Add seconds to the accumulated time of a phase."""
+		if self.enabled:
+			self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+	def incr(self, name, value=1):
+		"""Increment an event counter."""
+		if self.enabled:
+			self.counters[name] += value
+
+	def update_peak_memory(self):
+		"""Read the peak resident set size of the process."""
+		if not self.enabled or resource is None:
+			return
+
+		peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		# ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+		if sys.platform != "darwin":
+			peak *= 1024
+		self.peak_memory = peak
+
+	def as_dict(self):
+		"""Return the recorded statistics as a dictionary."""
+		return {
+			"timings": dict(self.timings),
+			"counters": dict(self.counters),
+			"peak_memory": self.peak_memory
+		}
+
+	def report(self):
+		"""Format the recorded statistics as a human readable string."""
+		lines = []
+		for name, seconds in self.timings.items():
+			lines.append("{:<28}{:>10.4f} s".format(name, seconds))
+
+		for name, value in sorted(self.counters.items()):
+			lines.append("{:<28}{:>10}".format(name, value))
+
+		if self.peak_memory is not None:
+			lines.append("{:<28}{:>10.1f} MB".format("peak_memory", self.peak_memory / 2**20))
+
+		return "\n".join(lines)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Training data sources. Resolves training file arguments, which may be plain or compressed files, directories or
+glob patterns relative to data/training, into a list of files and opens them as text streams. Compressed files
+are decompressed on the fly so they can be streamed to the trainer without an uncompressed copy on disk.
+
+Supported compression formats are gzip (.gz), bzip2 (.bz2), xz (.xz) and, if the zstandard package is installed,
+zstd (.zst).
+"""
+
+import os
+import io
+import glob
+import gzip
+import bz2
+import lzma
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+from src import utils
+from src import tokenizer
+
+
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".xz", ".zst")
+TEXT_EXTENSIONS = (".txt",)
+
+
+def is_training_file(path):
+	"""Check whether path is a plain or compressed text file to include when training from a directory."""
+	name = strip_compression(path)
+	return os.path.isfile(path) and name.endswith(TEXT_EXTENSIONS)
+
+def strip_compression(path):
+	"""Remove a compression extension from a path."""
+	root, ext = os.path.splitext(path)
+	return root if ext in COMPRESSED_EXTENSIONS else path
+
+def resolve(sources):
+	"""Resolve training sources into a list of files.
+	Args:
+		sources (list): files, directories or glob patterns. Relative paths are relative to data/training.
+	Return:
+		sorted list of file paths for each source, in the order of the sources
+	Raise:
+		FileNotFoundError if a source does not match any file
+	"""
+	paths = []
+	for source in sources:
+		path = os.path.join(utils.BASE, "data", "training", source)
+		if os.path.isdir(path):
+			matches = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+			matches = [match for match in matches if is_training_file(match)]
+		elif os.path.isfile(path):
+			matches = [path]
+		else:
+			matches = [match for match in glob.glob(path, recursive=True) if os.path.isfile(match)]
+
+		if not matches:
+			raise FileNotFoundError("Invalid training file: {}".format(path))
+		paths.extend(sorted(matches))
+
+	return paths
+
+def open_text(path):
+	"""Open a plain or compressed training file for reading as text."""
+	ext = os.path.splitext(path)[1]
+	if ext == ".gz":
+		return gzip.open(path, "rt")
+	elif ext == ".bz2":
+		return bz2.open(path, "rt")
+	elif ext == ".xz":
+		return lzma.open(path, "rt")
+	elif ext == ".zst":
+		if zstandard is None:
+			raise ImportError("Reading .zst files requires zstandard, install it with: pip install zstandard")
+		return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+
+	return open(path)
+
+def read_words(path, words_tokenizer=tokenizer.DEFAULT):
+	"""Read and tokenize a whole training file. Used as a worker function for tokenizing files in parallel."""
+	with open_text(path) as f:
+		return words_tokenizer.tokens(f.read())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tokenizer shared by the parsers and the trainer. A Tokenizer splits text to words on whitespace and can
+optionally, in the same pass:
+	drop words containing given substrings, eg. urls and mentions in tweets,
+	add missing spaces after punctuation, eg. "day.See" to "day. See",
+	intern words so repeated words share a single string object.
+
+Dropping and spacing are done with compiled patterns over the whole text instead of splitting and
+joining it for each rule. Only words that need spacing are handled in Python.
+"""
+
+import re
+import sys
+
+
+# words with punctuation followed by another character
+MISSING_SPACE = re.compile(r"\S*[.,!?]\S+")
+
+# a period in words containing these is not followed by a space, eg. in emails and urls
+PERIOD_EXCEPTIONS = ("@", "http", "...", "www")
+
+
+def add_missing_space(word):
+	"""Add missing spaces after punctuation within a word."""
+	if len(word) <= 3:
+		return word
+
+	# add missing space after period if not an email or url
+	if "." in word and not any(item in word for item in PERIOD_EXCEPTIONS):
+		word = word.replace(".", ". ").rstrip()
+
+	# for other characters, add the space and strip any extra space at the end
+	for char in (",", "!", "?"):
+		if char in word:
+			word = word.replace(char, char + " ").rstrip()
+
+	return word
+
+
+
+class Tokenizer():
+
+	def __init__(self, drop = (), space_punctuation = False, intern = False):
+		"""Compile the patterns of a tokenizer.
+		Args:
+			drop (iterable): words containing any of these substrings are removed
+			space_punctuation (boolean): whether to add missing spaces after punctuation
+			intern (boolean): whether to intern the words returned by tokens. Saves memory when holding
+				the words of a large text with many repeated words.
+		"""
+		self.drop = None
+		if drop:
+			self.drop = re.compile(r"\S*(?:{})\S*".format("|".join(map(re.escape, drop))))
+		self.space_punctuation = space_punctuation
+		self.intern = intern
+
+	def normalize(self, text):
+		"""Drop words and add missing spaces in text. Whitespace between the remaining words is kept as is."""
+		if self.drop is not None:
+			text = self.drop.sub("", text)
+		if self.space_punctuation:
+			text = MISSING_SPACE.sub(lambda match: add_missing_space(match.group()), text)
+
+		return text
+
+	def tokens(self, text):
+		"""Split text to a list of words."""
+		words = self.normalize(text).split()
+		if self.intern:
+			words = list(map(sys.intern, words))
+
+		return words
+
+	def join(self, text):
+		"""Normalize text to words separated by single spaces."""
+		return " ".join(self.normalize(text).split())
+
+
+DEFAULT = Tokenizer()
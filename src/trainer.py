@@ -8,54 +8,454 @@ words corresponding to each ngram.
 
 A trainer outputs the resulting json file to data/cache which is given as an input to a generator.
 Generating is done by choosing random n-1 rightmost words of the key + a random followup word.
+
+The json is stored as a section of a compiled model, see src/model.py. The model header records the ngram
+size and the checksum of the training data so up to date models do not need to be retrained.
+
+Alongside the json, a trainer writes an index from each word to the keys beginning with and containing it.
+Optionally, it also writes a Bloom filter of the k-grams of the training data for detecting generated text
+copied verbatim from the training data, see src/bloom.py.
+
+For training data too large to count in memory, a trainer can be given a memory budget. The training data is
+then streamed in chunks and whenever the budget is reached, the counts so far are spilled to disk as a sorted run.
+Finally the runs are k-way merged into the output model.
+
+The training data may be split over several files, directories or glob patterns, and the files may be compressed,
+see src/sources.py. The files are read in order as a single stream of words and decompressed on the fly. With more
+than one worker, files are decompressed and tokenized in parallel processes.
 """
 
 import os.path
+import re
+import glob
+import hashlib
 import collections
+import heapq
+import itertools
+import operator
+import tempfile
+import functools
+import multiprocessing
 import simplejson as json  # faster decoding than the standard library module
 
 from src import utils
+from src import profiler
+from src import model
+from src import bloom
+from src import sources
+from src import tokenizer
+
 
+CHUNK_SIZE = 2**16  # approximate number of characters to read from the training data at once
+PAIR_OVERHEAD = 200  # approximate memory usage in bytes of a counted (key, successor) pair apart from its strings
+INDEX_ENTRY_OVERHEAD = 100  # approximate memory usage in bytes of a (word, position) index entry apart from its word
+WORD_OVERHEAD = 100  # approximate memory usage in bytes of a word in a set apart from its characters
+MAX_OPEN_RUNS = 64  # maximum number of spilled runs to merge at once
+AVG_TOKEN_BYTES = 6  # average size of a word in the training data for sizing the Bloom filter when streaming
+COMPRESSION_RATIO = 4  # assumed compression ratio of compressed training files for sizing the Bloom filter
 
+# a word at the end of a block of text, possibly continuing in the next block
+PARTIAL_WORD = re.compile(r"\S+\Z")
 
 
 class Trainer():
 
-	def __init__(self, train_text_file, n = 3):
+	def __init__(self, train_text_file, n = 3, profile = False, memory_budget = None, overlap = None, output = None,
+			workers = 1):
 		"""Define filename to the training plain text file in data/trainnig and output json file in data/cache.
 		Also sets the size of the ngrams to use for training.
+		Args:
+			train_text_file (str or list): name of the training file in data/training, or a list of files,
+				directories or glob patterns in data/training. Files may be compressed.
+			n (int): ngram size
+			profile (boolean): whether to record phase timings and counters to self.stats
+			memory_budget (int): approximate memory in megabytes to use for counting before spilling to disk,
+				None to count in memory
+			overlap (int): span length k for the Bloom filter of the training data k-grams, None to skip the filter.
+				Must be larger than n since every generated span of n words or less is a span of the training data.
+			output (str): name of the model in data/cache, by default named after the training file. Required
+				for training from several sources or a glob pattern.
+			workers (int): number of processes for decompressing and tokenizing training files
 		"""
-		self.path_to_train_file = os.path.join(utils.BASE, "data", "training", train_text_file)
-		cache_filename = os.path.splitext(train_text_file)[0] + ".dat" # filename with new extension
-		self.cache_file = os.path.join(utils.BASE, "data", "cache", cache_filename)
+		if overlap is not None and overlap <= n:
+			raise ValueError("Overlap span length {} must be larger than the ngram size {}".format(overlap, n))
+
+		if isinstance(train_text_file, str):
+			train_text_file = [train_text_file]
+		# Resolved to a list of files by validate
+		self.train_files = [os.path.join(utils.BASE, "data", "training", source) for source in train_text_file]
+
+		if output is None:
+			if len(train_text_file) > 1 or glob.has_magic(train_text_file[0]):
+				raise ValueError("An output model name is required for training from several files")
+			name = os.path.basename(sources.strip_compression(os.path.normpath(train_text_file[0])))
+			output = os.path.splitext(name)[0] + ".dat" # filename with new extension
+		self.cache_file = os.path.join(utils.BASE, "data", "cache", output)
 
 		self.n = n # the size of the ngrams for training, the keys of the output json file will be the first n-1 words
+		self.stats = profiler.Stats(enabled=profile)
+		self.memory_budget = memory_budget
+		self.overlap = overlap
+		self.workers = workers
+		self._checksum = (None, None)  # the stamps of the training files and their checksum, see checksum
+		# Interning saves memory when all words of the training data are held in memory.
+		self.tokenizer = tokenizer.Tokenizer(intern=not memory_budget)
+
+	@property
+	def path_to_train_file(self):
+		"""Path to the first training file."""
+		return self.train_files[0]
+
+	@path_to_train_file.setter
+	def path_to_train_file(self, path):
+		self.train_files = [path]
 
 	def validate(self):
-		"""Check existance of the input training data file self.path_to_train_file."""
-		if not os.path.isfile(self.path_to_train_file):
-			msg = "Invalid training file: {}".format(self.path_to_train_file)
-			raise FileNotFoundError(msg)
+		"""Check existance of the input training data and resolve directories and glob patterns in
+		self.train_files to files.
+		"""
+		self.train_files = sources.resolve(self.train_files)
+
+	def checksum(self):
+		"""Compute the checksum of the training data. For a single file, this is the checksum of the file.
+		The checksum is computed once for both is_up_to_date and train unless the training files change.
+		"""
+		stamps = [(path, model.stamp(path)) for path in self.train_files]
+		if stamps == self._checksum[0]:
+			return self._checksum[1]
+
+		if len(self.train_files) == 1:
+			checksum = model.file_checksum(self.train_files[0])
+		else:
+			sha = hashlib.sha256()
+			for path in self.train_files:
+				sha.update(bytes.fromhex(model.file_checksum(path)))
+			checksum = sha.hexdigest()
+
+		self._checksum = (stamps, checksum)
+		return checksum
 
 	def train(self):
 		"""Create a the training file by ngramming the original text into n-1 predecessor and 1 succor key value
 		dict and store to file.
 		"""
-		data = collections.defaultdict(list)
-		for ngram in self.ngrams():
-			# Use the first n-1 words as a key and add the last word to the list of successors.
-			if utils.DELIMITER not in "".join(ngram[:-1]):  # ignore ngrams containing the key join delimiter character "_" 
-				key = utils.DELIMITER.join(ngram[:-1])
-				data[key].append(ngram[-1])
+		self.validate()
+		with self.stats.phase("read"):
+			checksum = self.checksum()
 
-		# Store the result to the cache file
-		with open(self.cache_file, "w") as f:
-			json.dump(data, f, indent=4, separators=(',', ':'))
+		with model.ModelWriter(self.cache_file, self.n, checksum) as writer:
+			if self.memory_budget:
+				self.train_external(writer)
+			else:
+				self.train_in_memory(writer)
 
-		avg_key_length = self.compute_variation(data)
+		self.stats.incr("keys", writer.states)
+		avg_key_length = writer.ngrams / max(writer.states, 1)
 		msg = "Model created at {}. Average key length: {:03.2f}".format(self.cache_file, avg_key_length)
 		print(msg)
 
+	def train_in_memory(self, writer):
+		"""Count the successors of all ngrams in memory and write them to a model."""
+		if self.workers > 1:
+			with self.stats.phase("tokenize"):
+				words = list(itertools.chain.from_iterable(self.read_words_parallel()))
+		else:
+			with self.stats.phase("read"):
+				train_data = self.read()
+
+			with self.stats.phase("tokenize"):
+				words = self.tokenizer.tokens(train_data)
+
+		with self.stats.phase("count"):
+			data = collections.defaultdict(list)
+			for ngram in self.split_ngrams(words):
+				# Use the first n-1 words as a key and add the last word to the list of successors.
+				if utils.DELIMITER not in "".join(ngram[:-1]):  # ignore ngrams containing the key join delimiter character "_" 
+					key = utils.DELIMITER.join(ngram[:-1])
+					data[key].append(ngram[-1])
+				else:
+					self.stats.incr("skipped_ngrams")
+
+		# Store the result to the cache file
+		with self.stats.phase("serialize"):
+			json.dump(data, writer.section("table"), indent=4, separators=(',', ':'))
+			json.dump(model.build_index(data), writer.section("index"), separators=(',', ':'))
+			writer.states = len(data)
+			writer.vocabulary = len(set(words))
+			writer.ngrams = sum(len(successors) for successors in data.values())
+
+		if self.overlap:
+			with self.stats.phase("overlap"):
+				span_filter = bloom.BloomFilter.for_capacity(self.overlap, len(words) - self.overlap + 1)
+				self.add_spans(span_filter, words)
+				writer.write_section("overlap", span_filter.to_bytes())
+
+		self.stats.incr("tokens", len(words))
+
+	def train_external(self, writer):
+		"""Count the successors of all ngrams within self.memory_budget by spilling sorted partial counts to
+		temporary files and merging them to the model.
+		"""
+		budget = self.memory_budget * 2**20
+		with tempfile.TemporaryDirectory(prefix="markov_") as tmpdir:
+			runs = []
+			vocabulary_runs = []  # sorted distinct words, merged to count the vocabulary
+			counts = collections.Counter()
+			size = 0
+			vocabulary = set()
+			carry = []  # the last n-1 words of the previous chunk for ngrams spanning chunks
+			if self.overlap:
+				capacity = sum(self.file_size(path) for path in self.train_files) // AVG_TOKEN_BYTES
+				span_filter = bloom.BloomFilter.for_capacity(self.overlap, capacity)
+				span_carry = []
+
+			for chunk in self.read_chunks():
+				with self.stats.phase("count"):
+					new_words = set(chunk).difference(vocabulary)
+					size += sum(map(len, new_words)) + WORD_OVERHEAD * len(new_words)
+					vocabulary.update(new_words)
+					words = carry + chunk
+					for ngram in self.split_ngrams(words):
+						if utils.DELIMITER not in "".join(ngram[:-1]):
+							pair = (utils.DELIMITER.join(ngram[:-1]), ngram[-1])
+							if pair not in counts:
+								size += len(pair[0]) + len(pair[1]) + PAIR_OVERHEAD
+							counts[pair] += 1
+						else:
+							self.stats.incr("skipped_ngrams")
+					carry = words[-(self.n - 1):] if self.n > 1 else []
+
+				if self.overlap:
+					with self.stats.phase("overlap"):
+						words = span_carry + chunk
+						self.add_spans(span_filter, words)
+						span_carry = words[-(self.overlap - 1):] if self.overlap > 1 else []
+
+				self.stats.incr("tokens", len(chunk))
+				if size >= budget:
+					with self.stats.phase("spill"):
+						runs.append(self.spill(counts, tmpdir))
+						vocabulary_runs.append(self.spill_sorted(((word,) for word in sorted(vocabulary)), tmpdir))
+					self.stats.incr("spilled_runs")
+					counts = collections.Counter()
+					vocabulary = set()
+					size = 0
+
+			if counts or vocabulary:
+				with self.stats.phase("spill"):
+					runs.append(self.spill(counts, tmpdir))
+					vocabulary_runs.append(self.spill_sorted(((word,) for word in sorted(vocabulary)), tmpdir))
+				self.stats.incr("spilled_runs")
+				counts = vocabulary = None
+
+			# Reduce the number of runs so they can be merged with a limited number of open files.
+			with self.stats.phase("merge"):
+				runs = self.reduce_runs(runs, tmpdir, self.merge_runs)
+				vocabulary_runs = self.reduce_runs(vocabulary_runs, tmpdir, self.merge_distinct)
+				writer.vocabulary = sum(1 for _ in self.merge_distinct(vocabulary_runs))
+
+			with self.stats.phase("serialize"):
+				self.write_merged_table(self.merge_runs(runs), writer, tmpdir, budget)
+				if self.overlap:
+					writer.write_section("overlap", span_filter.to_bytes())
+
+	def spill(self, counts, tmpdir):
+		"""Write (key, successor) counts sorted to a temporary run file.
+		Return:
+			path to the run file
+		"""
+		return self.spill_sorted(((key, word, count) for (key, word), count in sorted(counts.items())), tmpdir)
+
+	def spill_sorted(self, items, tmpdir):
+		"""Write sorted tuples, eg. (key, successor, count), to a temporary run file.
+		Return:
+			path to the run file
+		"""
+		fd, path = tempfile.mkstemp(suffix=".run", dir=tmpdir)
+		with open(fd, "w", encoding="utf8") as f:
+			for item in items:
+				f.write("\t".join(map(str, item)) + "\n")
+
+		return path
+
+	def read_run(self, path):
+		"""Read the tuples of a run file, the last field of tuples with several fields is an integer.
+		The run file is removed once consumed.
+		"""
+		with open(path, encoding="utf8") as f:
+			for line in f:
+				fields = line.rstrip("\n").split("\t")
+				if len(fields) > 1:
+					fields[-1] = int(fields[-1])
+				yield tuple(fields)
+		os.remove(path)
+
+	def reduce_runs(self, runs, tmpdir, merge):
+		"""Merge runs in batches until they can be merged with a limited number of open files."""
+		while len(runs) > MAX_OPEN_RUNS:
+			runs = runs[MAX_OPEN_RUNS:] + [self.spill_sorted(merge(runs[:MAX_OPEN_RUNS]), tmpdir)]
+
+		return runs
+
+	def merge_runs(self, runs):
+		"""k-way merge sorted run files. Counts of the same (key, successor) pair in different runs are summed.
+		Yield:
+			(key, successor, count) tuples in sorted order
+		"""
+		merged = heapq.merge(*[self.read_run(path) for path in runs])
+		for (key, word), items in itertools.groupby(merged, key=operator.itemgetter(0, 1)):
+			yield key, word, sum(item[2] for item in items)
+
+	def merge_distinct(self, runs):
+		"""k-way merge sorted run files of words, dropping duplicates.
+		Yield:
+			distinct (word,) tuples in sorted order
+		"""
+		merged = heapq.merge(*[self.read_run(path) for path in runs])
+		for item, _ in itertools.groupby(merged):
+			yield item
+
+	def write_merged_table(self, items, writer, tmpdir, budget):
+		"""Write sorted (key, successor, count) tuples as the successor json of a model. The word index of the
+		table is built within budget bytes by spilling sorted (word, position) entries to run files.
+		"""
+		entries = {"starts": [], "contains": []}
+		index_runs = {"starts": [], "contains": []}
+		size = 0
+		f = writer.section("table")
+		f.write("{")
+		for key, group in itertools.groupby(items, key=operator.itemgetter(0)):
+			successors = []
+			for _, word, count in group:
+				successors.extend([word] * count)
+
+			f.write("," if writer.states else "")
+			f.write("\n{}:{}".format(json.dumps(key), json.dumps(successors)))
+
+			# index entries as in model.IndexBuilder.add
+			words = key.split(utils.DELIMITER)
+			entries["starts"].append((words[0], writer.states))
+			size += len(words[0]) + INDEX_ENTRY_OVERHEAD
+			for word in dict.fromkeys(words):
+				entries["contains"].append((word, writer.states))
+				size += len(word) + INDEX_ENTRY_OVERHEAD
+			if size >= budget:
+				self.spill_index(entries, index_runs, tmpdir)
+				size = 0
+
+			writer.states += 1
+			writer.ngrams += len(successors)
+		f.write("\n}")
+
+		self.spill_index(entries, index_runs, tmpdir)
+		f = writer.section("index")
+		for i, kind in enumerate(("starts", "contains")):
+			f.write("{}{}:{{".format("," if i else "{", json.dumps(kind)))
+			runs = self.reduce_runs(index_runs[kind], tmpdir, self.merge_index)
+			for j, (word, group) in enumerate(itertools.groupby(self.merge_index(runs), key=operator.itemgetter(0))):
+				f.write("{}{}:[".format("," if j else "", json.dumps(word)))
+				f.write(",".join(str(position) for _, position in group))
+				f.write("]")
+			f.write("}")
+		f.write("}")
+
+	def spill_index(self, entries, index_runs, tmpdir):
+		"""Spill the (word, position) entries of each kind of index to a sorted run and clear them."""
+		for kind, kind_entries in entries.items():
+			if kind_entries:
+				index_runs[kind].append(self.spill_sorted(sorted(kind_entries), tmpdir))
+				kind_entries.clear()
+				self.stats.incr("spilled_index_runs")
+
+	def merge_index(self, runs):
+		"""k-way merge sorted run files of (word, position) index entries.
+		Yield:
+			(word, position) tuples in sorted order
+		"""
+		return heapq.merge(*[self.read_run(path) for path in runs])
+
+	def add_spans(self, span_filter, words):
+		"""Add every k consecutive words of a list of words to a Bloom filter."""
+		k = span_filter.k
+		for i in range(len(words) - k + 1):
+			span_filter.add(words[i: i + k])
+
+	def is_up_to_date(self):
+		"""Check whether the model in self.cache_file was already trained from the current training data
+		using the same ngram size and overlap span length.
+		"""
+		try:
+			header = model.read_header(self.cache_file)
+		except (FileNotFoundError, ValueError):
+			return False
+
+		if self.overlap:
+			if "overlap" not in header.sections:
+				return False
+			data = model.read_section(self.cache_file, "overlap", header, bloom.HEADER_SIZE)
+			if bloom.BloomFilter.span_length(data) != self.overlap:
+				return False
+
+		return header.order == self.n and "index" in header.sections and header.checksum == self.checksum()
+
+	def read(self):
+		"""Read the training data from file."""
+		texts = []
+		for path in self.train_files:
+			with sources.open_text(path) as f:
+				texts.append(f.read())
+
+		return "\n".join(texts)
+
+	def read_chunks(self):
+		"""Stream the training data in chunks of about CHUNK_SIZE characters. Chunks do not split words.
+		Yield:
+			the words of the next chunk
+		"""
+		if self.workers > 1:
+			# Each file is tokenized whole in a worker process, then counted in chunks of about CHUNK_SIZE characters.
+			chunk_words = CHUNK_SIZE // AVG_TOKEN_BYTES
+			for words in self.read_words_parallel():
+				for i in range(0, len(words), chunk_words):
+					yield words[i: i + chunk_words]
+			return
+
+		for path in self.train_files:
+			with sources.open_text(path) as f:
+				partial = ""
+				while True:
+					with self.stats.phase("read"):
+						block = f.read(CHUNK_SIZE)
+					if not block:
+						break
+
+					# Read by size rather than by lines since a file may be a single line. A word cut at the end of
+					# the block is carried over to the next block.
+					text = partial + block
+					match = PARTIAL_WORD.search(text)
+					partial = match.group() if match else ""
+					with self.stats.phase("tokenize"):
+						words = self.tokenizer.tokens(text[:len(text) - len(partial)])
+					yield words
+
+				if partial:
+					with self.stats.phase("tokenize"):
+						words = self.tokenizer.tokens(partial)
+					yield words
+
+	def read_words_parallel(self):
+		"""Decompress and tokenize the training files in a pool of self.workers processes.
+		Yield:
+			the words of each file, in order
+		"""
+		with multiprocessing.Pool(self.workers) as pool:
+			yield from pool.imap(functools.partial(sources.read_words, words_tokenizer=self.tokenizer), self.train_files)
+
+	def file_size(self, path):
+		"""Estimate the uncompressed size of a training file."""
+		size = os.path.getsize(path)
+		return size * COMPRESSION_RATIO if path.endswith(sources.COMPRESSED_EXTENSIONS) else size
+
 	def ngrams(self):
 		"""Generator for creating ngrams from the training data. For instance,
 		"What a lovely day" would create the following two 3-grams:
@@ -65,23 +465,17 @@ class Trainer():
 			the next ngram
 		"""
 		# Read the training data from file and split by words.
-		with open(self.path_to_train_file) as f:
-			train_data = f.read()
-			train_data = train_data.split()
+		train_data = self.tokenizer.tokens(self.read())
+		yield from self.split_ngrams(train_data)
 
-		if len(train_data) < self.n:
+	def split_ngrams(self, words):
+		"""Generator for creating ngrams from a list of words.
+		Yield:
+			the next ngram
+		"""
+		if len(words) < self.n:
 			return
 
 		# Yield each ngram
-		for i in range(len(train_data) - (self.n - 1)):
-			yield train_data[i: i + self.n]
-
-	def compute_variation(self, cache_data):
-		"""Compute average number of successors per key in the cache data."""
-		key_lens = []
-		for key in cache_data:
-			size = len(cache_data[key])
-			key_lens.append(size)
-
-		avg = sum(key_lens)/len(key_lens)
-		return avg
+		for i in range(len(words) - (self.n - 1)):
+			yield words[i: i + self.n]
@@ -2,10 +2,34 @@
 # -*- coding: utf-8 -*-
 
 import os.path
-import random
+import hashlib
+import secrets
+
+from src import postprocess
 
 BASE =  os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
 DELIMITER = "_"
+SENTENCE_END = (".", "!", "?", "...", "…")  # word endings that complete a sentence
+
+
+def spawn_seeds(seed, n):
+    """Derive n independent seeds from a root seed, eg. for generators running in separate worker
+    processes. Seeds are derived by hashing so the same root seed always spawns the same seeds.
+    Args:
+        seed (int): the root seed, None to draw one from system entropy
+        n (int): number of seeds to spawn
+    Return:
+        list of integer seeds
+    """
+    if seed is None:
+        seed = secrets.randbits(128)
+
+    seeds = []
+    for i in range(n):
+        digest = hashlib.sha256("{}:{}".format(seed, i).encode()).digest()
+        seeds.append(int.from_bytes(digest[:16], "big"))
+
+    return seeds
 
 
 def cleanup(tokens):
@@ -16,30 +40,9 @@ def cleanup(tokens):
     Return:
         the normalized sentence as a string
     """
-    # Capitalize and strip the first word (calling capitalize() on the whole string would
-    # decapitalize everyting else).
-    tokens[0] = tokens[0].capitalize().strip()
-    text = " ".join(tokens)
-    text = text.lstrip(" -*")
-
-    # Replace opening parathesis with a comma and remove closing paranthesesis.
-    # replace other inconvenient characters.
-    replacements = [
-        (" (", ","),
-        ("(", ""), # in case the first character of a sentence is "("
-        (")", ""),
-        ("\"", ""),
-        (u"“", ""),
-        (u"”", ""),
-        (u"”", ""),
-        (u"•", ""),
-        (u"●", ""),
-        (u"—", ""),
-        (u"…", "...")
-    ]
-    for item in replacements:
-        text = text.replace(item[0], item[1])
-
-
-    text = text.rstrip(",;:- ")
-    return text
\ No newline at end of file
+    return postprocess.DEFAULT.process(tokens)
+
+
+def token_length(token):
+    """Compute the length of a word in the text returned by cleanup, see PostProcessor.token_length."""
+    return postprocess.DEFAULT.token_length(token)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/bloom.py
+
+import unittest
+
+from src import bloom
+
+
+
+class BloomFilterTestCase(unittest.TestCase):
+	"""Test cases for the Bloom filter of training data spans."""
+
+	def setUp(self):
+		self.words = ["w{}".format(i % 997) for i in range(5000)]
+		self.filter = bloom.BloomFilter.for_capacity(3, len(self.words))
+		for i in range(len(self.words) - 2):
+			self.filter.add(self.words[i: i+3])
+
+	def test_added_spans_are_found(self):
+		"""Are all added spans reported as contained?"""
+		for i in range(len(self.words) - 2):
+			self.assertIn(self.words[i: i+3], self.filter)
+
+	def test_false_positive_rate(self):
+		"""Are spans that were not added rarely reported as contained?"""
+		false_positives = sum(["x{}".format(i), "y", "z"] in self.filter for i in range(10000))
+		self.assertLess(false_positives, 300)
+
+	def test_serialization(self):
+		"""Does a deserialized filter equal the original?"""
+		copy = bloom.BloomFilter.from_bytes(self.filter.to_bytes())
+		self.assertEqual((copy.k, copy.size, copy.hashes), (3, self.filter.size, self.filter.hashes))
+		self.assertEqual(copy.bits, self.filter.bits)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/dedup.py
+
+import unittest
+
+from src import dedup
+
+
+TEXT = ("Make sure to watch the debate tonight on all major networks, we will be talking about jobs, "
+	"the economy and how to make the country great again for all of our people")
+
+
+class DeduplicatorTestCase(unittest.TestCase):
+	"""Test cases for filtering duplicate and near duplicate texts."""
+
+	def setUp(self):
+		self.deduplicator = dedup.Deduplicator()
+
+	def test_exact_duplicates_ignore_case_and_whitespace(self):
+		"""Is a text differing only in case and whitespace an exact duplicate?"""
+		self.assertFalse(self.deduplicator.is_duplicate(TEXT))
+		self.assertTrue(self.deduplicator.is_duplicate("  " + TEXT.upper()))
+		self.assertEqual(self.deduplicator.exact_duplicates, 1)
+
+	def test_near_duplicates_are_filtered(self):
+		"""Is a text with a single changed word a near duplicate while an unrelated text is kept?"""
+		near = TEXT.replace("tonight", "today")
+		other = "Once upon a time there was a little girl who lived in a village near the forest"
+
+		texts = list(self.deduplicator.filter([TEXT, near, other]))
+		self.assertEqual(texts, [TEXT, other])
+		self.assertEqual(self.deduplicator.near_duplicates, 1)
+
+	def test_window_is_bounded(self):
+		"""Are the signatures of the oldest texts evicted once the window is full?"""
+		deduplicator = dedup.Deduplicator(window_size=5)
+		for i in range(20):
+			deduplicator.is_duplicate("text number {} is unique {}".format(i, "word{}".format(i) * 3))
+
+		self.assertEqual(len(deduplicator.signatures), 5)
+		ids = {id_ for bucket in deduplicator.buckets.values() for id_ in bucket}
+		self.assertEqual(ids, set(deduplicator.signatures))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -6,10 +6,12 @@
 import unittest
 from unittest.mock import Mock
 import os.path
-import json
 
 from src import generator
 from src import utils
+from src import model
+from src import profiler
+from src import bloom
 
 
 BASE =  os.path.dirname(__file__)
@@ -24,8 +26,7 @@ class GeneratorTestCase(unittest.TestCase):
 		self.generator = generator.Generator("foofile")
 
 		# Manually read training output from mock file
-		with open(os.path.join(BASE, "mock_train_file.dat")) as f:
-			self.generator.cache_data = json.load(f)
+		self.generator.cache_data = model.load_table(os.path.join(BASE, "mock_train_file.dat"))
 
 	def test_end_with_punctuation(self):
 		"""Does the generated text end with punctuation?"""
@@ -33,6 +34,91 @@ class GeneratorTestCase(unittest.TestCase):
 		punctuation = (".", "!", "?", "...", "…")
 		self.assertTrue(text.endswith(punctuation))
 
+	def test_seed_word_starts_text(self):
+		"""Does text generated with a seed word start with that word?"""
+		text = self.generator.generate(10, seed_word="National")
+		self.assertTrue(text.startswith("National"))
+
+	def test_must_include_word_is_included(self):
+		"""Does text generated with must_include contain the word?"""
+		text = self.generator.generate(10, must_include="Guard")
+		self.assertIn("Guard", text.split())
+
+	def test_unknown_seed_word_raises_error(self):
+		"""Does generating with a seed word not in the model raise an error?"""
+		self.assertRaises(ValueError, self.generator.generate, 10, seed_word="xyzzy")
+
+	def test_max_chars_limits_text_length(self):
+		"""Is text generated with a character limit within the limit and ending with a complete sentence?"""
+		for _ in range(20):
+			text = self.generator.generate(50, max_chars=140)
+			self.assertLessEqual(len(text), 140)
+			self.assertTrue(text.endswith(utils.SENTENCE_END))
+
+		text = self.generator.generate_paragraphs(50, 3, max_chars=280)
+		self.assertLessEqual(len(text), 280)
+
+	def test_max_chars_without_fitting_sentence_is_empty(self):
+		"""Is the text empty instead of a sentence fragment when no sentence fits the character limit?"""
+		self.generator.stats = profiler.Stats()
+		self.assertEqual(self.generator.generate(50, max_chars=1), "")
+		self.assertEqual(self.generator.stats.counters["budget_failures"], 1)
+
+		# paragraphs without a sentence are left out
+		self.assertEqual(self.generator.generate_paragraphs(50, 3, max_chars=10), "")
+
+	def test_token_length_bounds_cleanup_length(self):
+		"""Is the sum of token lengths an upper bound of the length of the cleaned up text?"""
+		tokens = "(Very) “fancy” words… and (more".split()
+		estimate = sum(map(utils.token_length, tokens)) - 1
+		self.assertEqual(estimate, len(utils.cleanup(tokens)))
+
+	def test_choose_word_avoids_overlap(self):
+		"""Are words continuing a span of the training data resampled and eventually restarted?"""
+		key = next(iter(self.generator.cache_data))
+		words = key.split(utils.DELIMITER)
+
+		# a filter that reports every span as copied
+		self.generator.overlap = bloom.BloomFilter(3, 1, 1)
+		self.generator.overlap.bits[0] = 1
+		self.generator.stats = profiler.Stats()
+		self.generator.choose_word(words, key)
+		self.assertEqual(self.generator.stats.counters["overlap_resamples"], generator.OVERLAP_RETRIES)
+		self.assertEqual(self.generator.stats.counters["overlap_restarts"], 1)
+
+		# an empty filter
+		self.generator.overlap = bloom.BloomFilter(3, 8, 1)
+		self.generator.stats = profiler.Stats()
+		self.generator.choose_word(words, key)
+		self.assertEqual(self.generator.stats.counters["overlap_resamples"], 0)
+
+		self.generator.overlap = None
+		self.generator.stats = profiler.Stats(enabled=False)
+
+	def test_key_list_is_cached_per_model(self):
+		"""Is the list of keys for random restarts built once and rebuilt for a new model?"""
+		keys = self.generator.get_keys()
+		self.assertIs(self.generator.get_keys(), keys)
+		self.assertIn(self.generator.random_key(), self.generator.cache_data)
+
+		cache_data = self.generator.cache_data
+		self.generator.cache_data = {"a_b": ["c"]}
+		try:
+			self.assertEqual(self.generator.get_keys(), ["a_b"])
+		finally:
+			self.generator.cache_data = cache_data
+
+	def test_profile_records_counters(self):
+		"""Does a profiling generator record generate timings and word counters?"""
+		self.generator.stats = profiler.Stats()
+		self.generator.generate(10)
+		self.generator.generate(10)
+
+		self.assertEqual(self.generator.stats.counters["words_generated"], 20)
+		self.assertIn("generate", self.generator.stats.timings)
+
+		self.generator.stats = profiler.Stats(enabled=False)
+
 	def test_cleanup(self):
 		"""Does utils.cleanup capitalize the first letter and remove non-sentence ending
 		punctuation?
@@ -0,0 +1,55 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Test cases for the command line arguments of main.py
+
+
+import unittest
+from unittest.mock import patch
+import os.path
+import shutil
+import tempfile
+
+import main
+from src import utils
+
+
+BASE =  os.path.dirname(__file__)
+
+class MainTestCase(unittest.TestCase):
+	"""Test cases for parsing command line arguments."""
+
+	def setUp(self):
+		self.parser = main.build_parser()
+		self.train_file = os.path.join(BASE, "mock_train_file.txt")
+
+	def train_args(self, argv):
+		args = self.parser.parse_args(["train"] + argv)
+		return main._split_ngram(args.training_file, args.ngram)
+
+	def test_ngram_option(self):
+		"""Is the ngram size read from -n and --ngram?"""
+		self.assertEqual(self.train_args([self.train_file, "-n", "4"]), ([self.train_file], 4))
+		self.assertEqual(self.train_args(["--ngram", "2", self.train_file]), ([self.train_file], 2))
+		self.assertEqual(self.train_args([self.train_file]), ([self.train_file], main.DEFAULT_NGRAM))
+
+	def test_trailing_ngram_size(self):
+		"""Is a trailing number read as the ngram size unless it is a training source?"""
+		self.assertEqual(self.train_args([self.train_file, "4"]), ([self.train_file], 4))
+
+		# an existing training file named by a number is a training source
+		tmpdir = tempfile.mkdtemp()
+		try:
+			os.makedirs(os.path.join(tmpdir, "data", "training"))
+			open(os.path.join(tmpdir, "data", "training", "2024"), "w").close()
+			with patch.object(utils, "BASE", tmpdir):
+				self.assertEqual(self.train_args([self.train_file, "2024"]), ([self.train_file, "2024"], main.DEFAULT_NGRAM))
+		finally:
+			shutil.rmtree(tmpdir)
+
+		# -n takes precedence over a trailing number
+		self.assertEqual(self.train_args([self.train_file, "4", "-n", "2"]), ([self.train_file, "4"], 2))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/model.py
+
+import unittest
+from unittest.mock import patch
+import os.path
+import shutil
+import tempfile
+
+from src import model
+from src import trainer
+from src import bloom
+from src import generator
+
+
+BASE =  os.path.dirname(__file__)
+
+
+class ModelTestCase(unittest.TestCase):
+	"""Test cases for compiled model files."""
+
+	def setUp(self):
+		self.tmpdir = tempfile.mkdtemp()
+		self.trainer = trainer.Trainer("foofile")
+		self.trainer.path_to_train_file = os.path.join(BASE, "mock_train_file.txt")
+		self.trainer.cache_file = os.path.join(self.tmpdir, "model.dat")
+		self.trainer.train()
+
+	def tearDown(self):
+		shutil.rmtree(self.tmpdir)
+
+	def test_header_describes_model(self):
+		"""Does the header record the ngram size, counts and the training data checksum?"""
+		header = model.read_header(self.trainer.cache_file)
+		table = model.load_table(self.trainer.cache_file)
+
+		self.assertEqual(header.version, model.VERSION)
+		self.assertEqual(header.order, 3)
+		self.assertEqual(header.states, len(table))
+		self.assertEqual(header.ngrams, sum(len(successors) for successors in table.values()))
+		self.assertEqual(header.checksum, model.file_checksum(self.trainer.path_to_train_file))
+		self.assertIn("table", header.sections)
+
+	def test_index_points_to_matching_keys(self):
+		"""Does the index section list the keys beginning with and containing each word?"""
+		index = model.load_index(self.trainer.cache_file)
+		keys = list(model.load_table(self.trainer.cache_file))
+
+		for word, positions in index["starts"].items():
+			for i in positions:
+				self.assertEqual(keys[i].split("_")[0], word)
+
+		for word, positions in index["contains"].items():
+			for i in positions:
+				self.assertIn(word, keys[i].split("_"))
+
+		self.assertEqual(index, model.build_index(keys))
+
+	def test_overlap_filter_contains_training_spans(self):
+		"""Does a model trained with overlap contain a filter of the training data spans?"""
+		self.trainer.overlap = 4
+		self.trainer.train()
+		span_filter = bloom.BloomFilter.from_bytes(model.read_section(self.trainer.cache_file, "overlap"))
+
+		words = self.trainer.read().split()
+		self.assertEqual(span_filter.k, 4)
+		for i in range(len(words) - 3):
+			self.assertIn(words[i: i+4], span_filter)
+
+	def test_validate_detects_corrupted_section(self):
+		"""Does validate raise an error when section contents have changed?"""
+		model.validate(self.trainer.cache_file)
+		with open(self.trainer.cache_file, "r+b") as f:
+			f.seek(model.HEADER_SIZE + 10)
+			f.write(b"#")
+
+		self.assertRaises(ValueError, model.validate, self.trainer.cache_file)
+
+	def test_read_header_rejects_legacy_model(self):
+		"""Is a plain json model rejected by read_header but still loadable?"""
+		legacy = os.path.join(self.tmpdir, "legacy.dat")
+		with open(legacy, "w") as f:
+			f.write('{"a_b": ["c"]}')
+
+		self.assertRaises(ValueError, model.read_header, legacy)
+		self.assertEqual(model.load_table(legacy), {"a_b": ["c"]})
+
+	def test_is_up_to_date(self):
+		"""Is a model up to date only for the same training data and ngram size?"""
+		self.assertTrue(self.trainer.is_up_to_date())
+
+		self.trainer.n = 2
+		self.assertFalse(self.trainer.is_up_to_date())
+
+	def test_training_stale_model_reads_training_data_once_for_checksum(self):
+		"""Is the checksum of the training data computed once for checking the model and retraining it?"""
+		trn = trainer.Trainer("foofile", 2)
+		trn.path_to_train_file = self.trainer.path_to_train_file
+		trn.cache_file = self.trainer.cache_file
+		with patch.object(model, "file_checksum", wraps=model.file_checksum) as file_checksum:
+			self.assertFalse(trn.is_up_to_date())
+			trn.train()
+			self.assertTrue(trn.is_up_to_date())
+		self.assertEqual(file_checksum.call_count, 1)
+
+	def test_is_up_to_date_checks_overlap_span_length(self):
+		"""Is a model up to date only for the same overlap span length?"""
+		self.trainer.overlap = 4
+		self.assertFalse(self.trainer.is_up_to_date())
+		self.trainer.train()
+		self.assertTrue(self.trainer.is_up_to_date())
+
+		self.trainer.overlap = 5
+		self.assertFalse(self.trainer.is_up_to_date())
+
+	def test_publish_keeps_latest_versions(self):
+		"""Is each trained model published as a new version and are old versions removed?"""
+		for _ in range(model.KEEP_VERSIONS + 1):
+			self.trainer.train()
+
+		versions = model.version_paths(self.trainer.cache_file)
+		self.assertEqual(len(versions), model.KEEP_VERSIONS)
+		self.assertTrue(versions[-1].endswith(".v{}.dat".format(model.KEEP_VERSIONS + 2)))
+		self.assertEqual(model.resolve_version(self.trainer.cache_file), versions[-1])
+
+	def test_failed_write_keeps_published_model(self):
+		"""Is the published model left intact when writing a new version fails?"""
+		with open(self.trainer.cache_file, "rb") as f:
+			published = f.read()
+
+		with self.assertRaises(RuntimeError):
+			with model.ModelWriter(self.trainer.cache_file, 3, "00" * 32) as writer:
+				writer.write_section("table", "{")
+				raise RuntimeError("interrupted")
+
+		with open(self.trainer.cache_file, "rb") as f:
+			self.assertEqual(f.read(), published)
+		self.assertEqual(len(model.version_paths(self.trainer.cache_file)), 1)
+
+	def test_generator_reloads_published_version(self):
+		"""Does a generator detect and swap in a newly published version of its model?"""
+		gen = generator.Generator(self.trainer.cache_file)
+		self.assertFalse(gen.model_changed())
+		self.assertFalse(gen.reload())
+
+		self.trainer.train()
+		self.assertTrue(gen.model_changed())
+		self.assertTrue(gen.reload())
+		self.assertEqual(gen.model_path, model.resolve_version(self.trainer.cache_file))
+		self.assertFalse(gen.model_changed())
+
+
+if __name__ == "__main__":
+	unittest.main()
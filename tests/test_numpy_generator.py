@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/numpy_generator.py
+
+import unittest
+from unittest.mock import patch
+import os.path
+
+from src import numpy_generator
+from src import generator
+from src import utils
+from src import model
+from src import bloom
+from src import parallel
+from src import profiler
+
+
+BASE =  os.path.dirname(__file__)
+
+
+@unittest.skipIf(numpy_generator.np is None, "numpy not installed")
+class NumpyGeneratorTestCase(unittest.TestCase):
+	"""Test cases for generating text with the NumPy engine."""
+
+	@classmethod
+	def setUpClass(self):
+		with patch.object(numpy_generator.NumpyGenerator, "get_cache_data") as mock_get_cache_data:
+			mock_get_cache_data.return_value = model.load_table(os.path.join(BASE, "mock_train_file.dat"))
+
+			self.generator = numpy_generator.NumpyGenerator("foofile")
+
+	def test_compiled_weights_match_successor_counts(self):
+		"""Does the cumulative weight of each state equal the number of its successors?"""
+		for i, key in enumerate(self.generator.cache_data):
+			total = self.generator.state_base[i+1] - self.generator.state_base[i]
+			self.assertEqual(total, len(self.generator.cache_data[key]))
+
+	def test_sampled_words_follow_their_keys(self):
+		"""Are sampled words valid successors of the previous n-1 sampled words?"""
+		ids = self.generator.sample(20, 30)
+		self.assertEqual(ids.shape, (20, 30))
+
+		for chain in ids.tolist():
+			words = [self.generator.vocab[i] for i in chain]
+			for i in range(2, len(words)):
+				key = utils.DELIMITER.join(words[i-2:i])
+				# words following a restart from a dead end do not continue the previous key
+				if key in self.generator.cache_data:
+					self.assertIn(words[i], self.generator.cache_data[key])
+
+	def test_seed_word_starts_first_paragraph(self):
+		"""Does the first paragraph start with the seed word?"""
+		text = self.generator.generate_paragraphs(10, 3, seed_word="National")
+		self.assertTrue(text.startswith("National"))
+
+	def test_max_chars_limits_text_length(self):
+		"""Is text generated with a character limit within the limit?"""
+		for _ in range(20):
+			text = self.generator.generate_paragraphs(50, 2, max_chars=280)
+			self.assertLessEqual(len(text), 280)
+
+	def test_max_chars_without_fitting_sentence_is_empty(self):
+		"""Are paragraphs left out instead of cut to sentence fragments when no sentence fits the character limit?"""
+		self.generator.stats = profiler.Stats()
+		self.assertEqual(self.generator.generate_paragraphs(50, 2, max_chars=4), "")
+		self.assertEqual(self.generator.stats.counters["budget_failures"], 2)
+
+	def test_paragraphs_end_with_punctuation(self):
+		"""Does each generated paragraph end with punctuation?"""
+		text = self.generator.generate_paragraphs(10, 5)
+		paragraphs = text.split("\n\n")
+		self.assertEqual(len(paragraphs), 5)
+		for p in paragraphs:
+			self.assertTrue(p.endswith(utils.SENTENCE_END))
+
+	def test_avoid_overlap_replaces_copied_words(self):
+		"""Are words completing a span of the training data replaced, also when resampling fails?"""
+		with open(os.path.join(BASE, "mock_train_file.txt")) as f:
+			words = f.read().split()
+		span_filter = bloom.BloomFilter.for_capacity(4, len(words))
+		for i in range(len(words) - 3):
+			span_filter.add(words[i: i+4])
+
+		self.generator.overlap = span_filter
+		try:
+			chains = [[self.generator.vocab[i] for i in ids] for ids in self.generator.generate_ids([40] * 50, False)]
+		finally:
+			self.generator.overlap = None
+
+		spans = [chain[i: i+4] for chain in chains for i in range(len(chain) - 3)]
+		copied = sum(span in span_filter for span in spans)
+		self.assertLess(copied, len(spans) * 0.05)
+
+	def test_parallel_chunks_are_batched(self):
+		"""Are seeded parallel runs generated in large chunks and independent of the number of workers?"""
+		self.assertGreater(self.generator.CHUNK_SIZE, generator.Generator.CHUNK_SIZE)
+		paragraphs = self.generator.CHUNK_SIZE + 1
+		text = parallel.generate_paragraphs(self.generator, 10, paragraphs, workers=1, seed=5)
+		self.assertEqual(len(text.split("\n\n")), paragraphs)
+		self.assertEqual(text, parallel.generate_paragraphs(self.generator, 10, paragraphs, workers=2, seed=5))
+
+
+if __name__ == "__main__":
+	unittest.main()
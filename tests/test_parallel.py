@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/parallel.py
+
+import unittest
+from unittest.mock import patch
+import os.path
+
+from src import generator
+from src import parallel
+from src import utils
+from src import model
+
+
+BASE =  os.path.dirname(__file__)
+
+
+class ParallelTestCase(unittest.TestCase):
+	"""Test cases for seeded and parallel generation."""
+
+	@classmethod
+	def setUpClass(self):
+		with patch.object(generator.Generator, "get_cache_data") as mock_get_cache_data:
+			mock_get_cache_data.return_value = model.load_table(os.path.join(BASE, "mock_train_file.dat"))
+
+			self.generator = generator.Generator("foofile")
+
+	def test_spawn_seeds_are_reproducible(self):
+		"""Does the same root seed spawn the same distinct seeds?"""
+		seeds = utils.spawn_seeds(42, 4)
+		self.assertEqual(seeds, utils.spawn_seeds(42, 4))
+		self.assertEqual(len(set(seeds)), 4)
+		self.assertNotEqual(seeds, utils.spawn_seeds(43, 4))
+
+	def test_seeded_generator_is_reproducible(self):
+		"""Does reseeding a generator reproduce its output?"""
+		self.generator.seed(1)
+		text = self.generator.generate_paragraphs(10, 3)
+		self.generator.seed(1)
+		self.assertEqual(text, self.generator.generate_paragraphs(10, 3))
+
+	def test_output_is_independent_of_number_of_workers(self):
+		"""Does a seeded parallel run produce the same paragraphs in the same order for any number of workers?"""
+		paragraphs = self.generator.CHUNK_SIZE * 2 + 1
+		text = parallel.generate_paragraphs(self.generator, 10, paragraphs, workers=1, seed=3)
+		self.assertEqual(len(text.split("\n\n")), paragraphs)
+
+		text2 = parallel.generate_paragraphs(self.generator, 10, paragraphs, workers=3, seed=3)
+		self.assertEqual(text, text2)
+
+
+if __name__ == "__main__":
+	unittest.main()
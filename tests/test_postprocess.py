@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/postprocess.py
+
+import unittest
+
+from src import postprocess
+
+
+class PostProcessorTestCase(unittest.TestCase):
+	"""Test cases for post-processing generated words to text."""
+
+	def test_default_profile_removes_inconvenient_characters(self):
+		"""Does the default profile replace parentheses, quotes and ellipses in a single pass?"""
+		tokens = "some “quoted” words (in parentheses) and… more,".split()
+		text = postprocess.DEFAULT.process(tokens)
+		self.assertEqual(text, "Some quoted words,in parentheses and... more")
+
+	def test_tweet_profile_removes_mentions(self):
+		"""Does the tweet profile remove @ characters within the token length bound?"""
+		processor = postprocess.PROFILES["tweet"]
+		tokens = "thanks @someone for the support!".split()
+		text = processor.process(tokens)
+		self.assertEqual(text, "Thanks someone for the support!")
+		self.assertEqual(sum(map(processor.token_length, tokens)) - 1, len(text))
+
+	def test_token_length_bounds_capitalization(self):
+		"""Is the token length an upper bound of words growing when capitalized?"""
+		tokens = ["ßo", "ßo"]
+		text = postprocess.DEFAULT.process(tokens)
+		self.assertEqual(text, "Sso ßo")
+		self.assertLessEqual(len(text), sum(map(postprocess.DEFAULT.token_length, tokens)) - 1)
+
+	def test_poem_profile_breaks_lines(self):
+		"""Does the poem profile break lines after clauses without changing the length?"""
+		tokens = "the sun is gone, the night is long. we wait".split()
+		text = postprocess.PROFILES["poem"].process(tokens)
+		self.assertEqual(text, "The sun is gone,\nthe night is long.\nwe wait")
+		self.assertEqual(len(text), len(postprocess.DEFAULT.process(tokens)))
+
+	def test_process_ids_matches_process(self):
+		"""Does processing vocabulary ids produce the same text as processing the words?"""
+		vocab = ["(hello", "world…", "again", "say"]
+		ids = [0, 1, 2]
+		self.assertEqual(postprocess.DEFAULT.process_ids(ids, vocab, ["say"]),
+			postprocess.DEFAULT.process(["say", "(hello", "world…", "again"]))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Import time benchmarks for the command line entrypoints main.py and parse_input.py
+
+
+import unittest
+import subprocess
+import sys
+import os.path
+
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY_MODULES = ("simplejson", "requests", "bs4", "twython", "dotenv", "numpy", "src.trainer", "src.generator")
+
+# Upper bound for importing an entrypoint module, in microseconds. Generous enough not to
+# fail on a busy machine but catches eagerly imported dependencies.
+IMPORT_TIME_BUDGET = 100000
+
+
+def run_python(code):
+	"""Run code in a fresh interpreter from the repository root and return stdout and stderr."""
+	res = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+	return res.stdout, res.stderr
+
+def cumulative_import_time(importtime_output, module):
+	"""Parse the cumulative import time of module from -X importtime output."""
+	for line in importtime_output.splitlines():
+		fields = [field.strip() for field in line.split("|")]
+		if len(fields) == 3 and fields[2] == module:
+			return int(fields[1])
+
+
+class StartupTestCase(unittest.TestCase):
+	"""Test cases for keeping the entrypoints fast to start."""
+
+	def test_entrypoints_do_not_import_heavy_modules(self):
+		"""Does importing main.py or parse_input.py avoid importing heavy dependencies?"""
+		for entrypoint in ("main", "parse_input"):
+			code = "import sys, {}; print(' '.join(sys.modules))".format(entrypoint)
+			stdout, _ = run_python(code)
+			loaded = stdout.split()
+			for module in HEAVY_MODULES:
+				self.assertNotIn(module, loaded, "{} imports {}".format(entrypoint, module))
+
+	def test_import_time_within_budget(self):
+		"""Are the entrypoints importable within the import time budget?"""
+		for entrypoint in ("main", "parse_input"):
+			_, stderr = run_python("import " + entrypoint)
+			elapsed = cumulative_import_time(stderr, entrypoint)
+			self.assertLess(elapsed, IMPORT_TIME_BUDGET)
+
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Test cases for src/tokenizer.py
+
+import unittest
+
+from src import tokenizer
+
+
+class TokenizerTestCase(unittest.TestCase):
+	"""Test cases for splitting text to words."""
+
+	def test_drop_removes_matching_words(self):
+		"""Are words containing a dropped substring removed in a single pass?"""
+		tweet_tokenizer = tokenizer.Tokenizer(drop=("http://", "https://", "@", "#"))
+		text = "Thanks @friend for the #support, see https://t.co/abc today"
+		self.assertEqual(tweet_tokenizer.join(text), "Thanks for the see today")
+
+	def test_space_punctuation_keeps_whitespace(self):
+		"""Are missing spaces added after punctuation without changing other whitespace?"""
+		parser_tokenizer = tokenizer.Tokenizer(space_punctuation=True)
+		text = "A lovely day.See you\nlater,alligator! Mail me at gopa.almostnone@kapina.de"
+		expected = "A lovely day. See you\nlater, alligator! Mail me at gopa.almostnone@kapina.de"
+		self.assertEqual(parser_tokenizer.normalize(text), expected)
+
+	def test_interned_tokens_share_strings(self):
+		"""Are repeated words the same object when interning?"""
+		words = tokenizer.Tokenizer(intern=True).tokens("".join(["the", " cat and ", "the", " dog"]))
+		self.assertEqual(words, ["the", "cat", "and", "the", "dog"])
+		self.assertIs(words[0], words[3])
+
+
+if __name__ == "__main__":
+	unittest.main()
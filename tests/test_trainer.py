@@ -7,9 +7,15 @@
 import unittest
 from unittest.mock import patch, mock_open
 import os.path
+import shutil
+import tempfile
+import gzip
+import bz2
 
 from src import trainer
 from src import utils
+from src import model
+from src import bloom
 
 
 BASE =  os.path.dirname(__file__)
@@ -19,14 +25,19 @@ class TrainerTestCase(unittest.TestCase):
 
 	@classmethod
 	def setUpClass(self):
+		self.tmpdir = tempfile.mkdtemp()
 		self.trainer = trainer.Trainer("foofile")
 
-		# Manaully reset the training input and output file paths to existing files
+		# Manaully reset the training input and output file paths, train to a temporary directory
 		self.trainer.path_to_train_file = os.path.join(BASE, "mock_train_file.txt")
-		self.trainer.cache_file = os.path.join(BASE, "mock_train_file.dat")
+		self.trainer.cache_file = os.path.join(self.tmpdir, "mock_train_file.dat")
 
 		self.trainer.train()
 
+	@classmethod
+	def tearDownClass(self):
+		shutil.rmtree(self.tmpdir)
+
 	def test_ngram_length(self):
 		"""Are created ngram of correct length?"""
 		ngrams = self.trainer.ngrams()
@@ -49,6 +60,130 @@ class TrainerTestCase(unittest.TestCase):
 
 		self.assertEqual(list(ngrams), expected)
 
+	def test_profile_records_phases(self):
+		"""Does a profiling trainer record timings for each training phase?"""
+		trn = trainer.Trainer("foofile", profile=True)
+		trn.path_to_train_file = self.trainer.path_to_train_file
+		trn.cache_file = os.path.join(self.tmpdir, "profile.dat")
+		trn.train()
+
+		self.assertEqual(list(trn.stats.timings), ["read", "tokenize", "count", "serialize"])
+		self.assertGreater(trn.stats.counters["keys"], 0)
+
+	def test_external_training_matches_in_memory_training(self):
+		"""Does training with a small memory budget spill to disk and produce the same successors?"""
+		tmpdir = tempfile.mkdtemp()
+		try:
+			trn = trainer.Trainer("foofile", profile=True, memory_budget=0.01, overlap=4)
+			trn.path_to_train_file = self.trainer.path_to_train_file
+			trn.cache_file = os.path.join(tmpdir, "external.dat")
+
+			# merge in several passes
+			with patch.object(trainer, "MAX_OPEN_RUNS", 2), patch.object(trainer, "CHUNK_SIZE", 100):
+				trn.train()
+
+			expected = model.load_table(self.trainer.cache_file)
+			table = model.load_table(trn.cache_file)
+			self.assertGreater(trn.stats.timings["spill"], 0)
+			self.assertEqual(sorted(table), sorted(expected))
+			for key in expected:
+				self.assertEqual(sorted(table[key]), sorted(expected[key]))
+
+			header = model.read_header(trn.cache_file)
+			expected_header = model.read_header(self.trainer.cache_file)
+			self.assertEqual(header.states, expected_header.states)
+			self.assertEqual(header.vocabulary, expected_header.vocabulary)
+			self.assertEqual(header.ngrams, expected_header.ngrams)
+
+			# the index is spilled and merged too, its positions refer to the same keys
+			self.assertGreater(trn.stats.counters["spilled_index_runs"], 2)
+			keys, expected_keys = list(table), list(expected)
+			index, expected_index = model.load_index(trn.cache_file), model.load_index(self.trainer.cache_file)
+			for kind in ("starts", "contains"):
+				self.assertEqual(sorted(index[kind]), sorted(expected_index[kind]))
+				for word, positions in expected_index[kind].items():
+					self.assertEqual(sorted(keys[i] for i in index[kind][word]), sorted(expected_keys[i] for i in positions))
+
+			# spans crossing chunk boundaries are in the overlap filter
+			span_filter = bloom.BloomFilter.from_bytes(model.read_section(trn.cache_file, "overlap"))
+			words = trn.read().split()
+			for i in range(len(words) - 3):
+				self.assertIn(words[i: i+4], span_filter)
+		finally:
+			shutil.rmtree(tmpdir)
+
+	def test_external_training_of_unigrams(self):
+		"""Are words counted once per chunk when training unigrams within a memory budget?"""
+		tmpdir = tempfile.mkdtemp()
+		try:
+			trn = trainer.Trainer("foofile", 1, memory_budget=0.01)
+			trn.path_to_train_file = self.trainer.path_to_train_file
+			trn.cache_file = os.path.join(tmpdir, "unigrams.dat")
+			with patch.object(trainer, "CHUNK_SIZE", 100):
+				trn.train()
+
+			header = model.read_header(trn.cache_file)
+			self.assertEqual(header.ngrams, len(trn.read().split()))
+		finally:
+			shutil.rmtree(tmpdir)
+
+	def test_training_from_compressed_files_matches_single_file(self):
+		"""Does training from several compressed files in parallel produce the same successors as the whole file?"""
+		tmpdir = tempfile.mkdtemp()
+		try:
+			with open(self.trainer.path_to_train_file) as f:
+				lines = f.readlines()
+			half = len(lines) // 2
+			with gzip.open(os.path.join(tmpdir, "a.txt.gz"), "wt") as f:
+				f.writelines(lines[:half])
+			with bz2.open(os.path.join(tmpdir, "b.txt.bz2"), "wt") as f:
+				f.writelines(lines[half:])
+
+			trn = trainer.Trainer([tmpdir], output="compressed.dat", workers=2)
+			trn.cache_file = os.path.join(tmpdir, "compressed.dat")
+			trn.train()
+
+			self.assertEqual(len(trn.train_files), 2)
+			expected = model.load_table(self.trainer.cache_file)
+			table = model.load_table(trn.cache_file)
+			self.assertEqual(table, expected)
+		finally:
+			shutil.rmtree(tmpdir)
+
+	def test_single_line_training_file_is_read_in_chunks(self):
+		"""Is a training file of a single line streamed in several chunks without splitting words?"""
+		tmpdir = tempfile.mkdtemp()
+		try:
+			with open(self.trainer.path_to_train_file) as f:
+				words = f.read().split()
+			path = os.path.join(tmpdir, "single_line.txt")
+			with open(path, "w") as f:
+				f.write(" ".join(words))
+
+			trn = trainer.Trainer("foofile", memory_budget=0.01)
+			trn.path_to_train_file = path
+			trn.cache_file = os.path.join(tmpdir, "single_line.dat")
+			with patch.object(trainer, "CHUNK_SIZE", 100):
+				chunks = list(trn.read_chunks())
+				trn.train()
+
+			self.assertGreater(len(chunks), 1)
+			self.assertEqual([word for chunk in chunks for word in chunk], words)
+			table = model.load_table(trn.cache_file)
+			expected = model.load_table(self.trainer.cache_file)
+			self.assertEqual(sorted(table), sorted(expected))
+		finally:
+			shutil.rmtree(tmpdir)
+
+	def test_overlap_must_be_larger_than_ngram_size(self):
+		"""Does creating a trainer with an overlap span length of at most n raise an error?"""
+		self.assertRaises(ValueError, trainer.Trainer, "foofile", 3, overlap=3)
+		self.assertEqual(trainer.Trainer("foofile", 3, overlap=4).overlap, 4)
+
+	def test_several_sources_require_output_name(self):
+		"""Does creating a trainer from several files without an output model name raise an error?"""
+		self.assertRaises(ValueError, trainer.Trainer, ["foo.txt", "bar.txt"])
+
 	def test_validate_raises_error_on_invalid_training_file(self):
 		"""Does validate raise error if trainer is created with invalid filename?"""
 		orig_path_to_train_file = self.trainer.path_to_train_file
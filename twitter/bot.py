@@ -20,6 +20,8 @@ from dotenv import load_dotenv
 RELATIVE_BASE = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(RELATIVE_BASE, "tweets.log")
 TWITTER_KEY_FILE = os.path.join(RELATIVE_BASE, "twitter_keys.env")
+TWEET_LENGTH = 280  # maximum number of characters in a tweet
+TWEET_RETRIES = 5  # attempts to generate a non empty text before giving up
 
 # import src module by adding the root folder to sys.path.
 # A dirty hack to enable easier running from cron
@@ -43,23 +45,33 @@ client = twython.Twython(APP_KEY, APP_SECRET,
 	OAUTH_TOKEN, OAUTH_TOKEN_SECRET)
 
 
+def tweet(generate, prefix=""):
+	"""Tweet a generated text. The text is generated again if it is empty, eg. when no sentence fit the tweet.
+	Args:
+		generate (function): returns a text of at most TWEET_LENGTH - len(prefix) characters
+		prefix (str): a string to start the tweet with
+	"""
+	for _ in range(TWEET_RETRIES):
+		text = generate()
+		if text.strip():
+			text = prefix + text
+			client.update_status(status=text)
+			logging.info(text)
+			return
+
+	logging.warning("No text generated in %d attempts, nothing tweeted", TWEET_RETRIES)
+
 def tweet_trumpet():
 	"""Generate and Tweet a realDonaldTrump text."""
-	gen = generator.Generator("@realDonaldTrump.dat")
-	text = gen.generate_paragraphs(25, 1)
-	text = "Trumpet:\n" + text.replace("@", "")
-
-	client.update_status(status=text)
-	logging.info(text)
+	gen = generator.Generator("@realDonaldTrump.dat", style="tweet")
+	prefix = "Trumpet:\n"
+	tweet(lambda: gen.generate_paragraphs(25, 1, max_chars=TWEET_LENGTH - len(prefix)), prefix)
 	
 def tweet_poem():
 	"""Generate and Tweet a poem."""
-	gen = generator.Generator("poems.dat")
+	gen = generator.Generator("poems.dat", style="poem")
 	paragrags = random.choice([2,3,4])
-	text = gen.generate_paragraphs(25, paragrags)
-
-	client.update_status(status=text)
-	logging.info(text)
+	tweet(lambda: gen.generate_paragraphs(25, paragrags, max_chars=TWEET_LENGTH))
 
 
 if __name__ == "__main__":
@@ -15,6 +15,8 @@ from dateutil.relativedelta import relativedelta
 import twython
 from dotenv import load_dotenv
 
+from src import dedup
+from src import tokenizer
 
 
 
@@ -40,6 +42,8 @@ OAUTH_TOKEN_SECRET = os.environ["OAUTH_SECRET"]
 client = twython.Twython(APP_KEY, APP_SECRET,
 	OAUTH_TOKEN, OAUTH_TOKEN_SECRET)
 
+TWEET_TOKENIZER = tokenizer.Tokenizer(drop=("http://", "https://", "@", "#"))
+
 
 def _get_tweet_metadata():
 	with open(METADATA_FILE) as f:
@@ -51,8 +55,7 @@ def _write_tweet_metadata(metadata):
 
 def filter_tweet(tweet_text):
 	"""Filter a tweet text by removing urls, mentions, etc."""
-	split = tweet_text.split()
-	text = " ".join( [word for word in split if not any(item in word for item in ("http://", "https://", "@", "#"))] )
+	text = TWEET_TOKENIZER.join(tweet_text)
 	text = text.replace("&amp;", "&")
 	return text
 
@@ -87,6 +90,7 @@ class TwitterParser():
 			Contents of the parsed tweets as a string.
 		"""
 		parsed_texts = []
+		deduplicator = dedup.Deduplicator()
 		if start_date == "previous_month":
 			start_date = (datetime.datetime.today() - relativedelta(months=1)).strftime("%Y-%m")
 
@@ -99,9 +103,11 @@ class TwitterParser():
 				with open(tweet_file) as f:
 					tweet_data = json.load(f)
 				
-				tweet_texts = [filter_tweet(t["full_text"]) for t in tweet_data]
-				parsed_texts.extend(tweet_texts)
-		
+				tweet_texts = (filter_tweet(t["full_text"]) for t in tweet_data)
+				parsed_texts.extend(deduplicator.filter(tweet_texts))
+
+		logging.info("Skipped %d duplicate and %d near duplicate tweets",
+			deduplicator.exact_duplicates, deduplicator.near_duplicates)
 		return "\n".join(parsed_texts)
 
 	def save(self, content):